@@ -65,7 +65,7 @@ from sandcastle.api.schemas import (
 )
 from sandcastle.config import settings
 from sandcastle.engine.dag import build_plan, parse_yaml_string, validate
-from sandcastle.engine.executor import execute_workflow
+from sandcastle.engine.executor import execute_workflow, materialize_checkpoints
 from sandcastle.engine.sandshore import SandshoreRuntime
 from sandcastle.engine.storage import create_storage
 from sandcastle.models.db import (
@@ -346,12 +346,11 @@ async def health_check() -> ApiResponse:
     if settings.redis_url:
         redis_ok = False
         try:
-            import redis.asyncio as aioredis
+            from sandcastle.engine.executor import get_redis
 
-            r = aioredis.from_url(settings.redis_url)
+            r = await get_redis()
             await r.ping()
             redis_ok = True
-            await r.aclose()
         except Exception:
             pass
 
@@ -1633,11 +1632,12 @@ async def cancel_run(run_id: str, req: Request) -> ApiResponse:
     # Set cancel flag (Redis or in-memory)
     if settings.redis_url:
         try:
-            import redis.asyncio as aioredis
+            from sandcastle.engine.executor import get_redis
 
-            r = aioredis.from_url(settings.redis_url)
+            r = await get_redis()
             await r.set(f"cancel:{run_id}", "1", ex=3600)  # 1h TTL
-            await r.aclose()
+            # Wake the run's cancel subscription right away
+            await r.publish(f"cancel:{run_id}", "1")
         except Exception as e:
             logger.error(f"Could not set cancel flag in Redis: {e}")
     else:
@@ -1796,14 +1796,15 @@ async def replay_run(run_id: str, request: ReplayRequest, req: Request) -> ApiRe
     # Find the newest checkpoint where from_step is NOT yet in step_outputs.
     # If no such checkpoint exists (from_step is the first step), use empty
     # context so the entire workflow replays from the beginning.
-    target_checkpoint = None
-    for cp in checkpoints:
-        snapshot = cp.context_snapshot
+    snapshots = materialize_checkpoints(
+        [cp.context_snapshot for cp in reversed(checkpoints)]
+    )
+    initial_context = None
+    for snapshot in reversed(snapshots):
         if request.from_step not in snapshot.get("step_outputs", {}):
-            target_checkpoint = cp
+            initial_context = snapshot
             break
 
-    initial_context = target_checkpoint.context_snapshot if target_checkpoint else None
     skip_steps = set(initial_context["step_outputs"].keys()) if initial_context else set()
     # Safety: never skip the step we're replaying from
     skip_steps.discard(request.from_step)
@@ -1934,14 +1935,15 @@ async def fork_run(run_id: str, request: ForkRequest, req: Request) -> ApiRespon
         checkpoints = result.scalars().all()
 
     # Find the newest checkpoint where from_step is NOT yet in step_outputs
-    target_checkpoint = None
-    for cp in checkpoints:
-        snapshot = cp.context_snapshot
+    snapshots = materialize_checkpoints(
+        [cp.context_snapshot for cp in reversed(checkpoints)]
+    )
+    initial_context = None
+    for snapshot in reversed(snapshots):
         if request.from_step not in snapshot.get("step_outputs", {}):
-            target_checkpoint = cp
+            initial_context = snapshot
             break
 
-    initial_context = target_checkpoint.context_snapshot if target_checkpoint else None
     skip_steps = set(initial_context["step_outputs"].keys()) if initial_context else set()
     # Safety: never skip the step we're forking from
     skip_steps.discard(request.from_step)
@@ -3062,8 +3064,11 @@ async def _resume_after_approval(
         result = await session.execute(checkpoint_stmt)
         checkpoints = result.scalars().all()
 
-    # Use the latest checkpoint
-    initial_context = checkpoints[0].context_snapshot if checkpoints else None
+    # Use the latest checkpoint, with earlier deltas folded in
+    snapshots = materialize_checkpoints(
+        [cp.context_snapshot for cp in reversed(checkpoints)]
+    )
+    initial_context = snapshots[-1] if snapshots else None
 
     # Set the approval step output in the context
     if initial_context:
@@ -32,6 +32,9 @@ class Settings(BaseSettings):
     # Max concurrent sandboxes (prevents rate limiting)
     max_concurrent_sandboxes: int = 5
 
+    # Max parallel_over items of one step in flight at once
+    max_parallel_items: int = 32
+
     # Database (empty = local SQLite mode)
     database_url: str = ""
 
@@ -456,27 +456,43 @@ class CloudflareBackend:
     ) -> None:
         self._worker_url = worker_url.rstrip("/") if worker_url else ""
         self._timeout = timeout
+        self._http = None
 
     @property
     def name(self) -> str:
         return "cloudflare"
 
+    def _get_http(self):
+        """Lazy-init a keep-alive HTTP client shared by all requests."""
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(self._timeout),
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=50,
+                    keepalive_expiry=60,
+                ),
+            )
+        return self._http
+
     async def health(self) -> bool:
         if not self._worker_url:
             return False
 
-        import httpx
-
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                resp = await client.get(f"{self._worker_url}/health")
-                data = resp.json()
-                return data.get("ok", False)
+            client = self._get_http()
+            resp = await client.get(f"{self._worker_url}/health", timeout=10)
+            data = resp.json()
+            return data.get("ok", False)
         except Exception:
             return False
 
     async def close(self) -> None:
-        pass
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     async def start(
         self,
@@ -504,15 +520,14 @@ class CloudflareBackend:
             "envs": envs,
         }
 
-        async with httpx.AsyncClient(
-            timeout=httpx.Timeout(timeout)
-        ) as client:
-            resp = await client.post(
-                f"{self._worker_url}/run",
-                json=payload,
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        client = self._get_http()
+        resp = await client.post(
+            f"{self._worker_url}/run",
+            json=payload,
+            timeout=httpx.Timeout(timeout),
+        )
+        resp.raise_for_status()
+        data = resp.json()
 
         # CF Sandbox returns batch response (stdout as a whole)
         stdout = data.get("stdout", "")
@@ -2,13 +2,32 @@
 
 from __future__ import annotations
 
+import logging
 import os
 import re
-from dataclasses import dataclass, field
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from operator import itemgetter
 from pathlib import Path
+from typing import Any
 
 import yaml
 
+from sandcastle.engine.policy import PolicyAction as PEPolicyAction
+from sandcastle.engine.policy import PolicyDefinition as PEPolicyDefinition
+from sandcastle.engine.policy import PolicyPattern as PEPolicyPattern
+from sandcastle.engine.policy import PolicyTrigger as PEPolicyTrigger
+from sandcastle.engine.policy import resolve_step_policies
+
+logger = logging.getLogger(__name__)
+
+# libyaml's C loader parses several times faster; fall back when PyYAML lacks it
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
 
 @dataclass
 class RetryConfig:
@@ -115,6 +134,74 @@ class SubWorkflowConfig:
     max_concurrent: int = 5
     timeout: int = 600
 
+    @cached_property
+    def output_accessors(self) -> tuple[tuple[str, Callable[[Any], Any]], ...]:
+        """``(target, accessor)`` pairs for ``output_mapping``, compiled once."""
+        return tuple(
+            (target, _compile_output_path(source))
+            for target, source in self.output_mapping.items()
+        )
+
+    @cached_property
+    def output_columns(self) -> tuple[tuple[str, Callable[[list], list]], ...]:
+        """``(target, extractor)`` pairs mapping a list of outputs at once."""
+        return tuple(
+            (target, _compile_output_column(source))
+            for target, source in self.output_mapping.items()
+        )
+
+
+def _lenient_lookup(value: Any, parts: tuple[str, ...]) -> Any:
+    """Walk *parts* through nested dicts, skipping parts a non-dict can't take."""
+    for part in parts:
+        if isinstance(value, dict):
+            value = value.get(part)
+    return value
+
+
+def _compile_output_path(source: str) -> Callable[[Any], Any]:
+    """Compile a dotted ``output_mapping`` path into a lookup function.
+
+    The fast path indexes straight through nested dicts. A missing key or a
+    non-dict value falls back to the lenient walk, which skips path parts
+    that cannot be applied to a non-dict value.
+    """
+    parts = tuple(source.split("."))
+
+    def access(value: Any) -> Any:
+        val = value
+        try:
+            for part in parts:
+                val = val[part]
+        except (KeyError, TypeError, IndexError):
+            return _lenient_lookup(value, parts)
+        return val
+
+    return access
+
+
+def _compile_output_column(source: str) -> Callable[[list], list]:
+    """Compile a dotted ``output_mapping`` path into a whole-list extractor.
+
+    Used for fan-out results: the path is applied one level at a time across
+    all outputs with ``map(itemgetter(part), ...)``, keeping the per-item loop
+    in C. If any output lacks a key or is not a dict, the column is rebuilt
+    with the lenient per-item walk, so results match ``_compile_output_path``.
+    """
+    parts = tuple(source.split("."))
+    getters = tuple(itemgetter(part) for part in parts)
+
+    def extract(outputs: list) -> list:
+        column = outputs
+        try:
+            for get in getters:
+                column = list(map(get, column))
+        except (KeyError, TypeError, IndexError):
+            return [_lenient_lookup(o, parts) for o in outputs]
+        return column
+
+    return extract
+
 
 @dataclass
 class SLOConfig:
@@ -175,6 +262,11 @@ class PolicyDefinition:
     severity: str = "medium"
 
 
+FAN_IN_STRATEGIES = ("list", "concat", "sum", "first", "last")
+
+CHECKPOINT_MODES = ("per_step", "final", "off")
+
+
 @dataclass
 class StepDefinition:
     """Definition of a single workflow step."""
@@ -186,6 +278,8 @@ class StepDefinition:
     max_turns: int = 10
     timeout: int = 300
     parallel_over: str | None = None
+    fan_in: str | None = None  # "list" | "concat" | "sum" | "first" | "last"
+    max_concurrent: int | None = None  # parallel_over items in flight; None = global limit
     output_schema: dict | None = None
     retry: RetryConfig | None = None
     fallback: FallbackConfig | None = None
@@ -199,6 +293,16 @@ class StepDefinition:
     slo: SLOConfig | None = None
     model_pool: list[ModelPoolOption] | None = None
 
+    @cached_property
+    def output_format(self) -> dict | None:
+        """Sandbox ``output_format`` for ``output_schema``, built once per step.
+
+        Shared by every attempt and parallel item of the step.
+        """
+        if not self.output_schema:
+            return None
+        return {"type": "json_schema", "schema": self.output_schema}
+
 
 @dataclass
 class WorkflowDefinition:
@@ -215,6 +319,7 @@ class WorkflowDefinition:
     on_failure: FailureConfig | None = None
     schedule: str | None = None
     policies: list[PolicyDefinition] = field(default_factory=list)
+    checkpoint_mode: str = "per_step"  # "per_step" | "final" | "off"
 
     def get_step(self, step_id: str) -> StepDefinition:
         """Get a step by its ID."""
@@ -229,6 +334,11 @@ class ExecutionPlan:
     """Topologically sorted execution stages."""
 
     stages: list[list[str]]  # e.g. [["scrape"], ["enrich"], ["score"]]
+    # Steps by id with workflow-level policies merged in, built by build_plan
+    # and shared by every run of the plan
+    resolved_steps: dict[str, StepDefinition] = field(
+        default_factory=dict, repr=False, compare=False,
+    )
 
 
 def _resolve_env_vars(value: str) -> str:
@@ -478,6 +588,8 @@ def _parse_step(data: dict, defaults: dict) -> StepDefinition:
         max_turns=data.get("max_turns", defaults.get("max_turns", 10)),
         timeout=data.get("timeout", defaults.get("timeout", 300)),
         parallel_over=data.get("parallel_over"),
+        fan_in=data.get("fan_in"),
+        max_concurrent=data.get("max_concurrent"),
         output_schema=data.get("output_schema"),
         retry=_parse_retry(data.get("retry")),
         fallback=_parse_fallback(data.get("fallback")),
@@ -541,6 +653,7 @@ def _parse_raw(data: dict) -> WorkflowDefinition:
         on_failure=on_failure,
         schedule=data.get("schedule"),
         policies=global_policies,
+        checkpoint_mode=data.get("checkpoint_mode", "per_step"),
     )
 
 
@@ -548,13 +661,13 @@ def parse(yaml_path: str) -> WorkflowDefinition:
     """Parse a workflow YAML file into a WorkflowDefinition."""
     path = Path(yaml_path)
     with path.open() as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=_SafeLoader)
     return _parse_raw(data)
 
 
 def parse_yaml_string(yaml_content: str) -> WorkflowDefinition:
     """Parse a workflow from a YAML string (for API submissions)."""
-    data = yaml.safe_load(yaml_content)
+    data = yaml.load(yaml_content, Loader=_SafeLoader)
     return _parse_raw(data)
 
 
@@ -568,6 +681,12 @@ def validate(workflow: WorkflowDefinition) -> list[str]:
     if not workflow.steps:
         errors.append("Workflow must have at least one step")
 
+    if workflow.checkpoint_mode not in CHECKPOINT_MODES:
+        errors.append(
+            f"Invalid checkpoint_mode: '{workflow.checkpoint_mode}'. "
+            f"Available: {', '.join(CHECKPOINT_MODES)}"
+        )
+
     step_ids = {s.id for s in workflow.steps}
 
     # Check for duplicate step IDs
@@ -624,6 +743,21 @@ def validate(workflow: WorkflowDefinition) -> list[str]:
                 f"Step '{step.id}' has invalid SLO optimize_for: '{step.slo.optimize_for}'"
             )
 
+    # Check fan-in reducers
+    for step in workflow.steps:
+        if step.fan_in is not None and step.fan_in not in FAN_IN_STRATEGIES:
+            errors.append(
+                f"Step '{step.id}' has invalid fan_in: '{step.fan_in}'. "
+                f"Available: {', '.join(FAN_IN_STRATEGIES)}"
+            )
+        if step.max_concurrent is not None and (
+            not isinstance(step.max_concurrent, int) or step.max_concurrent < 1
+        ):
+            errors.append(
+                f"Step '{step.id}' has invalid max_concurrent: {step.max_concurrent!r} "
+                "(must be a positive integer)"
+            )
+
     # Check for cycles
     cycle_errors = _detect_cycles(workflow.steps)
     errors.extend(cycle_errors)
@@ -658,10 +792,62 @@ def _detect_cycles(steps: list[StepDefinition]) -> list[str]:
     return errors
 
 
+def _global_policies(workflow: WorkflowDefinition) -> list[PEPolicyDefinition]:
+    """Convert the workflow-level DAG policies to policy engine definitions."""
+    global_policies = []
+    try:
+        for gp in workflow.policies:
+            patterns = gp.trigger.patterns
+            pe_trigger = PEPolicyTrigger(
+                type=gp.trigger.type,
+                patterns=[
+                    PEPolicyPattern(type=p.type, pattern=p.pattern) for p in patterns
+                ] if patterns else None,
+                expression=gp.trigger.expression,
+            )
+            pe_action = PEPolicyAction(
+                type=gp.action.type,
+                replacement=gp.action.replacement,
+                apply_to=gp.action.apply_to,
+                approval_config=gp.action.approval_config,
+                message=gp.action.message,
+                notify=gp.action.notify,
+            )
+            global_policies.append(PEPolicyDefinition(
+                id=gp.id,
+                trigger=pe_trigger,
+                action=pe_action,
+                description=gp.description,
+                severity=gp.severity,
+            ))
+    except Exception as e:
+        logger.warning(f"Could not load global policies: {e}")
+    return global_policies
+
+
+def _resolve_steps(workflow: WorkflowDefinition) -> dict[str, StepDefinition]:
+    """Steps by id with workflow-level policies merged in."""
+    global_policies = _global_policies(workflow) if workflow.policies else []
+    resolved: dict[str, StepDefinition] = {}
+    for step in workflow.steps:
+        if global_policies and step.policies is None:
+            step = replace(step, policies=global_policies)
+        elif global_policies and step.policies:
+            try:
+                step = replace(
+                    step, policies=resolve_step_policies(step.policies, global_policies),
+                )
+            except Exception as e:
+                logger.warning(f"Could not resolve step policies: {e}")
+        resolved[step.id] = step
+    return resolved
+
+
 def build_plan(workflow: WorkflowDefinition) -> ExecutionPlan:
     """Build an execution plan using topological sort.
 
-    Groups steps into stages where all steps in a stage can run in parallel.
+    Groups steps into stages where all steps in a stage can run in parallel,
+    and merges workflow-level policies into the steps for every run of the plan.
     """
     step_map = {s.id: s for s in workflow.steps}
     in_degree: dict[str, int] = {s.id: 0 for s in workflow.steps}
@@ -694,4 +880,4 @@ def build_plan(workflow: WorkflowDefinition) -> ExecutionPlan:
         unscheduled = set(step_map.keys()) - scheduled
         raise ValueError(f"Cannot build plan: unschedulable steps (cycle?): {unscheduled}")
 
-    return ExecutionPlan(stages=stages)
+    return ExecutionPlan(stages=stages, resolved_steps=_resolve_steps(workflow))
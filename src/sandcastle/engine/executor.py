@@ -3,28 +3,59 @@
 from __future__ import annotations
 
 import asyncio
+import collections
+import contextlib
 import csv
+import functools
+import hashlib
 import json
 import logging
+import random
 import re
+import time
 import uuid
-from dataclasses import dataclass, field
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
-
+from typing import Any, NamedTuple
+
+from sqlalchemy import select as sa_select
+from sqlalchemy import update as sa_update
+
+from sandcastle import config as app_config
+from sandcastle.engine.autopilot import (
+    apply_variant,
+    evaluate_result,
+    get_or_create_experiment,
+    maybe_complete_experiment,
+    pick_variant,
+    save_sample,
+)
 from sandcastle.engine.dag import (
+    ApprovalConfig,
     ExecutionPlan,
     StepDefinition,
     WorkflowDefinition,
+    build_plan,
+    parse_yaml_string,
+    validate,
 )
 from sandcastle.engine.events import event_bus
+from sandcastle.engine.optimizer import (
+    SLO,
+    CostLatencyOptimizer,
+    ModelOption,
+    calculate_budget_pressure,
+)
+from sandcastle.engine.policy import PolicyEngine, resolve_step_policies
 from sandcastle.engine.sandshore import (
     SandshoreError,
     SandshoreRuntime,
     get_sandshore_runtime,
 )
-from sandcastle.engine.storage import StorageBackend
+from sandcastle.engine.serialization import dumps_json
+from sandcastle.engine.storage import StorageBackend, create_storage
 
 logger = logging.getLogger(__name__)
 
@@ -37,8 +68,13 @@ _STEP_SYSTEM_PREFIX = (
     "Go straight to the answer.\n\n"
 )
 
+# Matches {var.path} template variables and {storage.PATH} references.
+_TEMPLATE_RE = re.compile(r"\{([^}]+)\}")
+_STORAGE_RE = re.compile(r"\{storage\.([^}]+)\}")
+_STORAGE_PREFIX = "storage."
 
-@dataclass
+
+@dataclass(slots=True)
 class StepResult:
     """Result from executing a single step."""
 
@@ -52,7 +88,7 @@ class StepResult:
     attempt: int = 1
 
 
-@dataclass
+@dataclass(slots=True)
 class RunContext:
     """Mutable context passed through the execution of a workflow run."""
 
@@ -64,35 +100,103 @@ class RunContext:
     error: str | None = None
     max_cost_usd: float | None = None
     workflow_name: str = ""
+    # Step IDs whose output changed since the last delta checkpoint, in write
+    # order (may repeat; the delta dict collapses duplicates)
+    dirty_step_ids: list[str] = field(default_factory=list, repr=False)
+    # Number of costs already included in a delta checkpoint
+    checkpointed_costs: int = field(default=0, repr=False)
+    # Set after restoring from a checkpoint; the next checkpoint is written in full
+    full_checkpoint_next: bool = field(default=False, repr=False)
+    # Sum of costs, kept current by add_cost
+    total_cost: float = field(default=0.0, init=False)
+
+    def __post_init__(self) -> None:
+        self.total_cost = sum(self.costs)
+
+    def set_output(self, step_id: str, output: Any) -> None:
+        """Record a step's output and mark it for the next delta checkpoint."""
+        self.step_outputs[step_id] = output
+        self.dirty_step_ids.append(step_id)
 
     def with_item(self, item: Any, index: int) -> RunContext:
-        """Create a child context for a parallel_over item."""
-        return RunContext(
+        """Create a child context for a parallel_over item.
+
+        The child reads the parent's step outputs through a ChainMap instead of
+        copying them per item; anything it writes stays in its own front map.
+        """
+        child = RunContext(
             run_id=self.run_id,
             input={**self.input, "_item": item, "_index": index},
-            step_outputs=dict(self.step_outputs),
-            costs=self.costs,
+            step_outputs=collections.ChainMap({}, self.step_outputs),
             status=self.status,
             max_cost_usd=self.max_cost_usd,
             workflow_name=self.workflow_name,
         )
-
-    @property
-    def total_cost(self) -> float:
-        return sum(self.costs)
+        # Budget checks inside the item see the run's spend so far; the
+        # parent records the item's cost itself once the fan-out finishes
+        child.total_cost = self.total_cost
+        return child
+
+    def add_cost(self, cost: float) -> None:
+        """Record a cost and add it to the running total."""
+        self.costs.append(cost)
+        self.total_cost += cost
+
+    def restore(self, snapshot: dict) -> None:
+        """Load step outputs and costs from a materialized checkpoint.
+
+        The next checkpoint is a full snapshot, so it stands on its own both
+        when the run already has checkpoints (resume after an approval) and
+        when it has none (replay or fork into a new run).
+        """
+        self.step_outputs = snapshot.get("step_outputs", {})
+        self.costs = list(snapshot.get("costs", []))
+        self.total_cost = sum(self.costs)
+        self.dirty_step_ids.clear()
+        self.checkpointed_costs = len(self.costs)
+        self.full_checkpoint_next = True
 
     def snapshot(self) -> dict:
-        """Create a serializable snapshot of the context for checkpointing."""
+        """Create a serializable snapshot of the context for checkpointing.
+
+        Containers that keep changing while the run progresses are copied
+        (shallowly) so the snapshot can be written later without racing.
+        """
         return {
             "run_id": self.run_id,
             "input": self.input,
-            "step_outputs": self.step_outputs,
-            "costs": self.costs,
+            "step_outputs": dict(self.step_outputs),
+            "costs": list(self.costs),
             "total_cost": self.total_cost,
         }
 
+    def delta_snapshot(self, full: bool = False) -> dict:
+        """Snapshot only the step outputs and costs added since the previous delta.
 
-@dataclass
+        Resets dirty tracking. Use ``materialize_checkpoints`` to rebuild
+        full contexts from a sequence of delta snapshots. The snapshot is a
+        full one when *full* is set and for the first one after ``restore``.
+        """
+        if full or self.full_checkpoint_next:
+            self.full_checkpoint_next = False
+            snapshot = self.snapshot()
+        else:
+            snapshot = {
+                "run_id": self.run_id,
+                "input": self.input,
+                "step_outputs": {
+                    sid: self.step_outputs[sid] for sid in self.dirty_step_ids
+                },
+                "costs": self.costs[self.checkpointed_costs:],
+                "total_cost": self.total_cost,
+                "delta": True,
+            }
+        self.dirty_step_ids.clear()
+        self.checkpointed_costs = len(self.costs)
+        return snapshot
+
+
+@dataclass(slots=True)
 class WorkflowResult:
     """Final result of a workflow execution."""
 
@@ -105,6 +209,55 @@ class WorkflowResult:
     completed_at: datetime | None = None
 
 
+@functools.lru_cache(maxsize=1024)
+def _compile_var_path(var_path: str) -> tuple | None:
+    """Parse a dotted variable path into a reusable lookup program.
+
+    Returns ``(root, step_id, keys)`` where *root* is ``"input"``,
+    ``"steps"``, ``"run_id"`` or ``"date"`` and *keys* is a tuple of
+    ``(part, index)`` pairs with list indices pre-coerced to int.
+    Returns None for paths that can never resolve.
+    """
+    parts = var_path.split(".")
+
+    def _keys(raw: list[str]) -> tuple[tuple[str, int | None], ...]:
+        keys = []
+        for part in raw:
+            try:
+                index = int(part)
+            except ValueError:
+                index = None
+            keys.append((part, index))
+        return tuple(keys)
+
+    if parts[0] == "input":
+        return ("input", None, _keys(parts[1:]))
+    if parts[0] == "steps" and len(parts) >= 3 and parts[2] == "output":
+        return ("steps", parts[1], _keys(parts[3:]))
+    if var_path in ("run_id", "date"):
+        return (var_path, None, ())
+    return None
+
+
+def _walk(obj: Any, keys: tuple[tuple[str, int | None], ...]) -> Any:
+    """Follow pre-parsed path keys through nested dicts and lists.
+
+    Mapping lookups are tried first, so a path through plain dicts costs
+    one subscript per key; lists and scalars are sorted out on the
+    (rarer) TypeError.
+    """
+    for part, index in keys:
+        try:
+            obj = obj[part]
+        except KeyError:
+            return None
+        except TypeError:
+            if not isinstance(obj, list):
+                return None
+            obj = obj[index if index is not None else int(part)]
+    return obj
+
+
 def resolve_variable(var_path: str, context: RunContext) -> Any:
     """Resolve a dotted variable path against the run context.
 
@@ -115,44 +268,71 @@ def resolve_variable(var_path: str, context: RunContext) -> Any:
     - run_id -> current run UUID
     - date -> current ISO date
     """
-    parts = var_path.split(".")
+    program = _compile_var_path(var_path)
+    if program is None:
+        return None
+    root, step_id, keys = program
 
-    if parts[0] == "input":
-        obj = context.input
-        for part in parts[1:]:
-            if isinstance(obj, dict):
-                obj = obj.get(part)
-            elif isinstance(obj, list):
-                obj = obj[int(part)]
-            else:
-                return None
-        return obj
+    if root == "input":
+        return _walk(context.input, keys)
 
-    if parts[0] == "steps" and len(parts) >= 3:
-        step_id = parts[1]
+    if root == "steps":
         step_data = context.step_outputs.get(step_id)
         if step_data is None:
             return None
-        if parts[2] == "output":
-            if len(parts) == 3:
-                return step_data
-            obj = step_data
-            for part in parts[3:]:
-                if isinstance(obj, dict):
-                    obj = obj.get(part)
-                elif isinstance(obj, list):
-                    obj = obj[int(part)]
-                else:
-                    return None
-            return obj
-
-    if var_path == "run_id":
+        return _walk(step_data, keys)
+
+    if root == "run_id":
         return context.run_id
 
-    if var_path == "date":
-        return datetime.now(timezone.utc).date().isoformat()
+    return datetime.now(timezone.utc).date().isoformat()
 
-    return None
+
+def _format_value(value: Any) -> str:
+    """Render a resolved variable for prompt substitution."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+@functools.lru_cache(maxsize=256)
+def _unreferenced_deps(template: str, depends_on: tuple[str, ...]) -> tuple[str, ...]:
+    """Return the dependencies that *template* never mentions, once per template."""
+    return tuple(
+        dep for dep in depends_on
+        if f"steps.{dep}." not in template and f"steps.{dep}}}" not in template
+    )
+
+
+def _inject_dependency_outputs(
+    resolved: str,
+    template: str,
+    context: RunContext,
+    depends_on: list[str] | None,
+) -> str:
+    """Append outputs of dependencies that *template* does not reference."""
+    if not depends_on:
+        return resolved
+    missing = [
+        dep for dep in _unreferenced_deps(template, tuple(depends_on))
+        if dep in context.step_outputs
+    ]
+    if not missing:
+        return resolved
+    context_block = "\n".join(
+        f"[{dep}]: {_format_value(context.step_outputs[dep])}" for dep in missing
+    )
+    return f"{resolved}\n\nContext from previous steps:\n{context_block}"
+
+
+@functools.lru_cache(maxsize=256)
+def _split_template(template: str) -> tuple[str, ...]:
+    """Pre-parse a template into alternating literal text and variable paths.
+
+    Even indexes hold literal text, odd indexes the inner text of a
+    ``{...}`` placeholder, so a template is tokenized once per process.
+    """
+    return tuple(_TEMPLATE_RE.split(template))
 
 
 def resolve_templates(
@@ -167,61 +347,243 @@ def resolve_templates(
     DAG edges imply data flow without requiring manual ``{steps.X.output}``
     placeholders.
     """
+    if "{" not in template:
+        return _inject_dependency_outputs(template, template, context, depends_on)
+
+    pieces = _split_template(template)
+    parts = [pieces[0]]
+    # A placeholder repeated in one template is resolved and formatted once
+    resolved: dict[str, str] = {}
+    for i in range(1, len(pieces), 2):
+        var_path = pieces[i]
+        replacement = resolved.get(var_path)
+        if replacement is None:
+            value = resolve_variable(var_path, context)
+            replacement = "{" + var_path + "}" if value is None else _format_value(value)
+            resolved[var_path] = replacement
+        parts.append(replacement)
+        parts.append(pieces[i + 1])
+    return _inject_dependency_outputs("".join(parts), template, context, depends_on)
+
+
+async def _read_storage_paths(
+    paths: list[str], storage: StorageBackend,
+) -> dict[str, str | None]:
+    """Read several storage paths concurrently."""
+    contents = await asyncio.gather(*(storage.read(path) for path in paths))
+    return dict(zip(paths, contents))
+
+
+class _SharedReads:
+    """Storage wrapper whose concurrent and repeated reads of a path share one fetch.
+
+    Scoped to a single fan-out, where every item resolves the same
+    ``{storage.PATH}`` refs. Writes and deletes pass through and drop the
+    cached read; a failed read is not cached.
+    """
 
-    def _replace(match: re.Match) -> str:
-        var_path = match.group(1)
-        value = resolve_variable(var_path, context)
-        if value is None:
-            return match.group(0)
-        if isinstance(value, (dict, list)):
-            return json.dumps(value)
-        return str(value)
-
-    resolved = re.sub(r"\{([^}]+)\}", _replace, template)
-
-    # Auto-inject unreferenced dependency outputs
-    if depends_on:
-        missing = [
-            dep for dep in depends_on
-            if f"steps.{dep}." not in template and f"steps.{dep}}}" not in template
-            and dep in context.step_outputs
-        ]
-        if missing:
-            parts = []
-            for dep in missing:
-                data = context.step_outputs[dep]
-                formatted = json.dumps(data) if isinstance(data, (dict, list)) else str(data)
-                parts.append(f"[{dep}]: {formatted}")
-            context_block = "\n".join(parts)
-            resolved = f"{resolved}\n\nContext from previous steps:\n{context_block}"
+    def __init__(self, storage: StorageBackend) -> None:
+        self._storage = storage
+        self._reads: dict[str, asyncio.Future[str | None]] = {}
+
+    async def read(self, path: str) -> str | None:
+        fut = self._reads.get(path)
+        if fut is None:
+            fut = self._reads[path] = asyncio.ensure_future(self._storage.read(path))
+        try:
+            # Shielded so one cancelled reader doesn't cancel the others
+            return await asyncio.shield(fut)
+        except Exception:
+            if self._reads.get(path) is fut:
+                del self._reads[path]
+            raise
+
+    async def write(self, path: str, content: str) -> None:
+        self._reads.pop(path, None)
+        await self._storage.write(path, content)
 
-    return resolved
+    async def list(self, prefix: str) -> list[str]:
+        return await self._storage.list(prefix)
+
+    async def delete(self, path: str) -> None:
+        self._reads.pop(path, None)
+        await self._storage.delete(path)
 
 
 async def resolve_storage_refs(prompt: str, storage: StorageBackend) -> str:
-    """Replace {storage.PATH} references with stored content."""
+    """Replace {storage.PATH} references with stored content.
+
+    Each distinct path is read once and all reads run concurrently.
+    """
+    if "{storage." not in prompt:
+        return prompt
+
+    paths = list(dict.fromkeys(m.group(1) for m in _STORAGE_RE.finditer(prompt)))
+    reads = await _read_storage_paths(paths, storage)
 
-    async def _resolve(match: re.Match) -> str:
-        path = match.group(1)
-        content = await storage.read(path)
+    def _replace(match: re.Match) -> str:
+        content = reads[match.group(1)]
         return content if content is not None else match.group(0)
 
-    pattern = re.compile(r"\{storage\.([^}]+)\}")
-    result = prompt
-    for match in pattern.finditer(prompt):
-        replacement = await _resolve(match)
-        result = result.replace(match.group(0), replacement, 1)
+    return _STORAGE_RE.sub(_replace, prompt)
 
-    return result
+
+async def resolve_prompt(
+    prompt: str,
+    context: RunContext,
+    storage: StorageBackend,
+    depends_on: list[str] | None = None,
+) -> str:
+    """Resolve template variables and {storage.PATH} refs in a single pass.
+
+    Equivalent to ``resolve_templates`` followed by ``resolve_storage_refs``
+    but scans the prompt once. Each storage path is read at most once, and
+    all reads run concurrently.
+    """
+    if "{" not in prompt:
+        return _inject_dependency_outputs(prompt, prompt, context, depends_on)
+    pieces = _split_template(prompt)
+    paths = list(dict.fromkeys(
+        inner[len(_STORAGE_PREFIX):] for inner in pieces[1::2]
+        if inner.startswith(_STORAGE_PREFIX) and len(inner) > len(_STORAGE_PREFIX)
+    ))
+    reads = await _read_storage_paths(paths, storage) if paths else {}
+    parts = [pieces[0]]
+    resolved: dict[str, str] = {}
+    for i in range(1, len(pieces), 2):
+        inner = pieces[i]
+        replacement = resolved.get(inner)
+        if replacement is None:
+            if inner.startswith(_STORAGE_PREFIX) and len(inner) > len(_STORAGE_PREFIX):
+                content = reads[inner[len(_STORAGE_PREFIX):]]
+                replacement = content if content is not None else "{" + inner + "}"
+            else:
+                value = resolve_variable(inner, context)
+                replacement = "{" + inner + "}" if value is None else _format_value(value)
+            resolved[inner] = replacement
+        parts.append(replacement)
+        parts.append(pieces[i + 1])
+    return _inject_dependency_outputs("".join(parts), prompt, context, depends_on)
+
+
+# Exponential backoff by attempt number; reaches the 60s cap at attempt 6
+_EXP_BACKOFF = tuple(min(2**attempt, 60) for attempt in range(7))
 
 
 def _backoff_delay(attempt: int, backoff: str = "exponential") -> float:
     """Calculate backoff delay in seconds."""
     if backoff == "exponential":
-        return min(2**attempt, 60)  # Cap at 60s
+        return _EXP_BACKOFF[min(attempt, len(_EXP_BACKOFF) - 1)]
     return 2.0  # Fixed 2s delay
 
 
+@functools.cache
+def _models_db():
+    """Import ``sandcastle.models.db`` on first use and keep the module object.
+
+    The import stays lazy so loading the executor does not create the engine.
+    Attributes are read off the module at call time, so patches still apply.
+    """
+    import sandcastle.models.db as db
+
+    return db
+
+
+class _RunStepWrite(NamedTuple):
+    """One RunStep state transition waiting for the batch writer."""
+
+    run_id: str
+    step_id: str
+    status: str
+    parallel_index: int | None
+    output_data: dict | None
+    cost_usd: float
+    duration_seconds: float
+    attempt: int
+    error: str | None
+    model: str | None
+    now: datetime
+    started_at: datetime | None = None
+
+
+class _CheckpointWrite(NamedTuple):
+    """A RunCheckpoint row committed in the same batch as pending RunStep writes."""
+
+    run_id: str
+    step_id: str
+    stage_index: int
+    snapshot: dict
+    done: asyncio.Future
+
+
+class _FlushMarker(NamedTuple):
+    """Resolved once every write queued before it has been committed."""
+
+    done: asyncio.Future
+
+
+_RUN_STEP_BATCH_MAX = 500
+
+# Steps that finish within this many seconds get a single RunStep write on
+# completion; only slower ones also get an intermediate "running" row.
+_RUNNING_ROW_DELAY = 2.0
+
+
+class _RunStepWriter:
+    """Long-lived task that persists queued RunStep writes in batches.
+
+    Writes queued while a commit is in flight are picked up together by the
+    next one, so a burst of transitions (e.g. a wide fan-out) costs a single
+    SELECT and commit instead of one session per write. Checkpoints go
+    through the same queue and share the commit of the step rows before them.
+    """
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue[
+            _RunStepWrite | _CheckpointWrite | _FlushMarker
+        ] = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < _RUN_STEP_BATCH_MAX and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await _write_run_steps(batch)
+
+
+_run_step_writer: _RunStepWriter | None = None
+
+
+def _get_run_step_writer() -> _RunStepWriter:
+    """Return the writer for the running event loop, starting it on first use."""
+    global _run_step_writer
+    writer = _run_step_writer
+    if (
+        writer is None
+        or writer.task.done()
+        or writer.task.get_loop() is not asyncio.get_running_loop()
+    ):
+        writer = _run_step_writer = _RunStepWriter()
+    return writer
+
+
+async def flush_run_steps() -> None:
+    """Wait until every RunStep write queued so far has been committed.
+
+    Writes queued after the call (e.g. by other runs) are not waited for.
+    """
+    writer = _run_step_writer
+    if (
+        writer is not None
+        and not writer.task.done()
+        and writer.task.get_loop() is asyncio.get_running_loop()
+    ):
+        done = asyncio.get_running_loop().create_future()
+        writer.queue.put_nowait(_FlushMarker(done))
+        await done
+
+
 async def _save_run_step(
     run_id: str,
     step_id: str,
@@ -233,81 +595,172 @@ async def _save_run_step(
     attempt: int = 1,
     error: str | None = None,
     model: str | None = None,
+    now: datetime | None = None,
+    started_at: datetime | None = None,
 ) -> None:
-    """Create or update a RunStep record in the database.
-
-    Uses upsert: INSERT on first call (running), UPDATE on completion/failure.
+    """Queue a create-or-update of a RunStep record.
+
+    The first write for a step INSERTs, later ones UPDATE it (see
+    ``_write_run_steps``). Returns without waiting for the database; use
+    ``flush_run_steps`` to wait for persistence. *now* is the timestamp
+    recorded as started_at/completed_at; callers that already hold one pass
+    it through instead of reading the clock again. *started_at* is used when
+    a finished step is inserted without an earlier "running" row.
     """
-    try:
-        from sqlalchemy import select as sa_select
+    output_data = (
+        output if isinstance(output, dict)
+        else {"result": output} if output else None
+    )
+    _get_run_step_writer().queue.put_nowait(_RunStepWrite(
+        run_id=run_id,
+        step_id=step_id,
+        status=status,
+        parallel_index=parallel_index,
+        output_data=output_data,
+        cost_usd=cost_usd,
+        duration_seconds=duration_seconds,
+        attempt=attempt,
+        error=error,
+        model=model,
+        now=now or datetime.now(timezone.utc),
+        started_at=started_at,
+    ))
+
+
+def _queue_running_step(
+    run_id: str,
+    step_id: str,
+    parallel_index: int | None,
+    started_at: datetime,
+) -> None:
+    """Queue the deferred "running" row of a step that is still executing."""
+    _get_run_step_writer().queue.put_nowait(_RunStepWrite(
+        run_id=run_id,
+        step_id=step_id,
+        status="running",
+        parallel_index=parallel_index,
+        output_data=None,
+        cost_usd=0.0,
+        duration_seconds=0.0,
+        attempt=1,
+        error=None,
+        model=None,
+        now=started_at,
+        started_at=started_at,
+    ))
 
-        from sandcastle.models.db import RunStep, StepStatus, async_session
 
-        status_map = {
-            "pending": StepStatus.PENDING,
-            "running": StepStatus.RUNNING,
-            "completed": StepStatus.COMPLETED,
-            "failed": StepStatus.FAILED,
-            "skipped": StepStatus.SKIPPED,
-            "awaiting_approval": StepStatus.AWAITING_APPROVAL,
-        }
+@functools.cache
+def _step_status_map() -> dict[str, Any]:
+    """Map executor status strings to StepStatus members, built once."""
+    return {status.value: status for status in _models_db().StepStatus}
 
-        now = datetime.now(timezone.utc)
-        db_status = status_map.get(status, StepStatus.PENDING)
-        output_data = (
-            output if isinstance(output, dict)
-            else {"result": output} if output else None
-        )
 
-        async with async_session() as session:
-            # Try to find existing step record (from the "running" INSERT)
-            run_uuid = uuid.UUID(run_id)
-            existing = await session.scalar(
-                sa_select(RunStep).where(
-                    RunStep.run_id == run_uuid,
-                    RunStep.step_id == step_id,
-                    RunStep.parallel_index == parallel_index,
+async def _write_run_steps(
+    batch: list[_RunStepWrite | _CheckpointWrite | _FlushMarker],
+) -> None:
+    """Apply queued RunStep writes in order, plus any checkpoints, in one transaction.
+
+    If the batch commit fails, each write is retried in its own transaction
+    so one bad row does not take the rest of the batch with it. Checkpoint
+    and flush waiters are released once the batch has been handled.
+    """
+    writes = [w for w in batch if not isinstance(w, _FlushMarker)]
+    try:
+        if writes:
+            await _commit_run_step_writes(writes)
+    except Exception as e:
+        logger.warning(
+            f"Could not save batch of {len(writes)} RunStep write(s), "
+            f"retrying one at a time: {e}"
+        )
+        for w in writes:
+            try:
+                await _commit_run_step_writes([w])
+            except Exception as e:
+                kind = "checkpoint" if isinstance(w, _CheckpointWrite) else "RunStep"
+                logger.warning(
+                    f"Lost {kind} write for run {w.run_id} step {w.step_id}: {e}"
                 )
+    finally:
+        for w in batch:
+            if not isinstance(w, _RunStepWrite) and not w.done.done():
+                w.done.set_result(None)
+
+
+async def _commit_run_step_writes(batch: list[_RunStepWrite | _CheckpointWrite]) -> None:
+    """Commit RunStep writes and checkpoints in a single session."""
+    step_writes = [w for w in batch if isinstance(w, _RunStepWrite)]
+    checkpoints = [w for w in batch if isinstance(w, _CheckpointWrite)]
+    db = _models_db()
+    status_map = _step_status_map()
+
+    keys = {
+        (uuid.UUID(w.run_id), w.step_id, w.parallel_index) for w in step_writes
+    }
+    async with db.async_session() as session:
+        # Load existing step records (from earlier "running" INSERTs) at once
+        rows: dict[tuple, Any] = {}
+        found = await session.scalars(
+            sa_select(db.RunStep).where(
+                db.RunStep.run_id.in_({key[0] for key in keys}),
+                db.RunStep.step_id.in_({key[1] for key in keys}),
             )
-
+        ) if keys else ()
+        for row in found:
+            key = (row.run_id, row.step_id, row.parallel_index)
+            if key in keys:
+                rows.setdefault(key, row)
+
+        for w in step_writes:
+            key = (uuid.UUID(w.run_id), w.step_id, w.parallel_index)
+            db_status = status_map.get(w.status, db.StepStatus.PENDING)
+            finished = w.status in ("completed", "failed", "skipped")
+            existing = rows.get(key)
             if existing:
                 # Update existing record
                 existing.status = db_status
-                if output_data is not None:
-                    existing.output_data = output_data
-                if cost_usd:
-                    existing.cost_usd = cost_usd
-                if duration_seconds:
-                    existing.duration_seconds = duration_seconds
-                existing.attempt = attempt
-                existing.error = error
-                if model:
-                    existing.model = model
-                if status in ("completed", "failed", "skipped"):
-                    existing.completed_at = now
+                if w.output_data is not None:
+                    existing.output_data = w.output_data
+                if w.cost_usd:
+                    existing.cost_usd = w.cost_usd
+                if w.duration_seconds:
+                    existing.duration_seconds = w.duration_seconds
+                existing.attempt = w.attempt
+                existing.error = w.error
+                if w.model:
+                    existing.model = w.model
+                if finished:
+                    existing.completed_at = w.now
             else:
                 # Create new record
-                step = RunStep(
-                    run_id=run_uuid,
-                    step_id=step_id,
-                    parallel_index=parallel_index,
+                rows[key] = db.RunStep(
+                    run_id=key[0],
+                    step_id=w.step_id,
+                    parallel_index=w.parallel_index,
                     status=db_status,
-                    output_data=output_data,
-                    cost_usd=cost_usd,
-                    duration_seconds=duration_seconds,
-                    attempt=attempt,
-                    error=error,
-                    model=model,
-                    started_at=now if status == "running" else None,
-                    completed_at=(
-                        now if status in ("completed", "failed", "skipped")
-                        else None
+                    output_data=w.output_data,
+                    cost_usd=w.cost_usd,
+                    duration_seconds=w.duration_seconds,
+                    attempt=w.attempt,
+                    error=w.error,
+                    model=w.model,
+                    started_at=w.started_at or (
+                        w.now if w.status == "running" else None
                     ),
+                    completed_at=w.now if finished else None,
                 )
-                session.add(step)
-            await session.commit()
-    except Exception as e:
-        logger.warning(f"Could not save RunStep for {step_id}: {e}")
+                session.add(rows[key])
+        session.add_all([
+            db.RunCheckpoint(
+                run_id=uuid.UUID(c.run_id),
+                step_id=c.step_id,
+                stage_index=c.stage_index,
+                context_snapshot=c.snapshot,
+            )
+            for c in checkpoints
+        ])
+        await session.commit()
 
 
 async def _save_checkpoint(
@@ -316,21 +769,137 @@ async def _save_checkpoint(
     stage_index: int,
     context: RunContext,
 ) -> None:
-    """Save a checkpoint after completing a stage for replay/fork support."""
-    try:
-        from sandcastle.models.db import RunCheckpoint, async_session
+    """Save a checkpoint after completing a stage for replay/fork support.
 
-        async with async_session() as session:
-            checkpoint = RunCheckpoint(
-                run_id=uuid.UUID(run_id),
-                step_id=step_id,
-                stage_index=stage_index,
-                context_snapshot=context.snapshot(),
+    The checkpoint is a full snapshot; later delta checkpoints layer on it.
+    """
+    await _write_checkpoint(
+        run_id, step_id, stage_index, context.delta_snapshot(full=True),
+    )
+
+
+async def _write_checkpoint(
+    run_id: str,
+    step_id: str,
+    stage_index: int,
+    snapshot: dict,
+) -> None:
+    """Persist a RunCheckpoint row from an already-taken context snapshot.
+
+    The row is committed by the RunStep batch writer, together with the step
+    writes queued before it; this returns once that commit has run.
+    """
+    done = asyncio.get_running_loop().create_future()
+    _get_run_step_writer().queue.put_nowait(_CheckpointWrite(
+        run_id=run_id,
+        step_id=step_id,
+        stage_index=stage_index,
+        snapshot=snapshot,
+        done=done,
+    ))
+    await done
+
+
+def materialize_checkpoints(snapshots: list[dict]) -> list[dict]:
+    """Expand checkpoint snapshots, ordered by stage_index, into full contexts.
+
+    Delta snapshots only carry the step outputs and costs added since the
+    previous checkpoint and are layered on top of everything before them;
+    full snapshots (e.g. the one saved before an approval gate) reset the base.
+    """
+    materialized: list[dict] = []
+    outputs: dict[str, Any] = {}
+    costs: list[float] = []
+    for snapshot in snapshots:
+        if snapshot.get("delta"):
+            outputs = outputs.copy()
+            outputs.update(snapshot.get("step_outputs", {}))
+            costs = costs + snapshot.get("costs", [])
+        else:
+            outputs = dict(snapshot.get("step_outputs", {}))
+            costs = list(snapshot.get("costs", []))
+        full = dict(snapshot)
+        full.pop("delta", None)
+        full["step_outputs"] = outputs
+        full["costs"] = costs
+        materialized.append(full)
+    return materialized
+
+
+class _CheckpointItem(NamedTuple):
+    """A checkpoint handed to the background writer."""
+
+    step_id: str
+    stage_index: int
+    context_snapshot: dict
+
+
+class _LatestCheckpoint:
+    """Single-slot mailbox holding only the newest pending checkpoint.
+
+    Publishing never blocks; a checkpoint that is superseded before the
+    writer picks it up is dropped, since resume only needs the latest.
+    Delta checkpoints absorb the outputs and costs of the one they replace.
+
+    The slot also hands out the run's stage indexes: one per completed step
+    and one per approval gate, so no two checkpoints of a run share one and
+    they sort in the order their snapshots were taken.
+    """
+
+    def __init__(self, stage_index: int = 0) -> None:
+        self.item: _CheckpointItem | None = None
+        self.closed = False
+        self.event = asyncio.Event()
+        self.stage_index = stage_index
+
+    def next_stage(self) -> int:
+        """Return the stage index for a snapshot taken now."""
+        self.stage_index += 1
+        return self.stage_index
+
+    def supersede(self) -> None:
+        """Drop the pending checkpoint; a full snapshot taken now covers it."""
+        self.item = None
+
+    def publish(self, item: _CheckpointItem) -> None:
+        pending = self.item
+        if pending is not None and item.context_snapshot.get("delta"):
+            # Fold the superseded delta in so its outputs and costs are not lost
+            snapshot = item.context_snapshot
+            snapshot["step_outputs"] = {
+                **pending.context_snapshot["step_outputs"],
+                **snapshot["step_outputs"],
+            }
+            snapshot["costs"] = pending.context_snapshot["costs"] + snapshot["costs"]
+            if not pending.context_snapshot.get("delta"):
+                # Layered on a full snapshot, the merged one is full as well
+                del snapshot["delta"]
+        self.item = item
+        self.event.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.event.set()
+
+
+async def _checkpoint_writer(run_id: str, slot: _LatestCheckpoint) -> None:
+    """Write the latest published checkpoint until the slot is closed and empty."""
+    while True:
+        await slot.event.wait()
+        slot.event.clear()
+        item, slot.item = slot.item, None
+        if item is not None:
+            await _write_checkpoint(
+                run_id, item.step_id, item.stage_index, item.context_snapshot,
             )
-            session.add(checkpoint)
-            await session.commit()
-    except Exception as e:
-        logger.warning(f"Could not save checkpoint for step {step_id}: {e}")
+        if slot.closed and slot.item is None:
+            return
+
+
+async def _close_checkpoint_writer(slot: _LatestCheckpoint, writer: asyncio.Task) -> None:
+    """Close the slot and wait for the writer to flush what is still pending."""
+    slot.close()
+    await writer
 
 
 # In-memory cancel flags for local mode (no Redis)
@@ -345,21 +914,19 @@ def cancel_run_local(run_id: str) -> None:
 _redis_pool = None
 
 
-async def _get_redis():
-    """Return a shared Redis connection (reused across cancel checks)."""
+async def get_redis():
+    """Return the shared Redis client; its connection pool is reused by all callers."""
     global _redis_pool
     if _redis_pool is None:
         import redis.asyncio as aioredis
 
-        from sandcastle.config import settings
-
-        _redis_pool = aioredis.from_url(settings.redis_url)
+        _redis_pool = aioredis.from_url(app_config.settings.redis_url)
     return _redis_pool
 
 
 async def _check_cancel(run_id: str) -> bool:
     """Check if a run has been cancelled via Redis flag or in-memory set."""
-    from sandcastle.config import settings
+    settings = app_config.settings
 
     if not settings.redis_url:
         # Local mode: check in-memory set and clean up after detection
@@ -368,14 +935,92 @@ async def _check_cancel(run_id: str) -> bool:
             return True
         return False
 
+    # A run with a live cancel watch answers without a round-trip
+    event = _cancel_events.get(run_id)
+    if event is not None:
+        return event.is_set()
+
+    return await _read_cancel_flag(run_id)
+
+
+async def _read_cancel_flag(run_id: str) -> bool:
+    """Read a run's cancel flag from Redis; a failed read counts as not cancelled."""
     try:
-        r = await _get_redis()
+        r = await get_redis()
         result = await r.get(f"cancel:{run_id}")
         return result is not None
     except Exception:
         return False
 
 
+# Per-run cancel events, set by the run's cancel watch
+_cancel_events: dict[str, asyncio.Event] = {}
+
+# Seconds between re-reads of the cancel flag while a run is subscribed
+_CANCEL_POLL_INTERVAL = 10.0
+
+
+async def _watch_cancel(run_id: str, event: asyncio.Event) -> None:
+    """Set *event* once the run is cancelled.
+
+    Listens on the run's cancel channel, and re-reads the cancel flag when
+    the watch starts and every ``_CANCEL_POLL_INTERVAL`` seconds: the flag
+    may be set before the subscription takes effect, and pubsub messages
+    are lost across a reconnect. If the subscription fails, the flag is
+    only polled.
+    """
+    try:
+        r = await get_redis()
+        async with r.pubsub() as pubsub:
+            await pubsub.subscribe(f"cancel:{run_id}")
+            while not await _read_cancel_flag(run_id):
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=_CANCEL_POLL_INTERVAL,
+                )
+                if message is not None:
+                    break
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"Cancel subscription for run {run_id} failed, polling: {e}")
+        while not await _read_cancel_flag(run_id):
+            await asyncio.sleep(_CANCEL_POLL_INTERVAL)
+    event.set()
+
+
+@contextlib.asynccontextmanager
+async def _cancel_watch(run_id: str, shared: asyncio.Event | None = None):
+    """Keep one cancel watch open for the duration of a run (Redis mode only).
+
+    Sub-workflow runs pass their parent's event as *shared* and are
+    cancelled along with the parent instead of opening their own watch.
+    """
+    settings = app_config.settings
+
+    if not settings.redis_url:
+        yield
+        return
+
+    if shared is not None:
+        _cancel_events[run_id] = shared
+        try:
+            yield
+        finally:
+            _cancel_events.pop(run_id, None)
+        return
+
+    event = asyncio.Event()
+    _cancel_events[run_id] = event
+    watcher = asyncio.create_task(_watch_cancel(run_id, event))
+    try:
+        yield
+    finally:
+        watcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await watcher
+        _cancel_events.pop(run_id, None)
+
+
 def _check_budget(context: RunContext) -> str | None:
     """Check if the run has exceeded its budget.
 
@@ -404,7 +1049,7 @@ def _write_csv_output(
     directory = Path(cfg.directory).expanduser().resolve()
 
     # Enforce sandbox root when configured
-    from sandcastle.config import settings
+    settings = app_config.settings
 
     if settings.sandbox_root:
         sandbox = Path(settings.sandbox_root).expanduser().resolve()
@@ -578,7 +1223,7 @@ def _write_pdf_report(
     directory = Path(cfg.directory).expanduser().resolve()
 
     # Enforce sandbox root when configured
-    from sandcastle.config import settings
+    settings = app_config.settings
 
     if settings.sandbox_root:
         sandbox = Path(settings.sandbox_root).expanduser().resolve()
@@ -633,6 +1278,10 @@ def _write_pdf_report(
         return None
 
 
+# Step fields a fork may override
+_STEP_OVERRIDE_FIELDS = ("prompt", "model", "max_turns", "timeout")
+
+
 async def execute_step_with_retry(
     step: StepDefinition,
     context: RunContext,
@@ -644,36 +1293,11 @@ async def execute_step_with_retry(
     """Execute a step with retry logic and exponential backoff."""
     # Apply step overrides for fork
     if step_overrides:
-        if "prompt" in step_overrides:
-            step = StepDefinition(
-                id=step.id,
-                prompt=step_overrides["prompt"],
-                depends_on=step.depends_on,
-                model=step_overrides.get("model", step.model),
-                max_turns=step_overrides.get("max_turns", step.max_turns),
-                timeout=step_overrides.get("timeout", step.timeout),
-                parallel_over=step.parallel_over,
-                output_schema=step.output_schema,
-                retry=step.retry,
-                fallback=step.fallback,
-                csv_output=step.csv_output,
-                pdf_report=step.pdf_report,
-            )
-        elif "model" in step_overrides:
-            step = StepDefinition(
-                id=step.id,
-                prompt=step.prompt,
-                depends_on=step.depends_on,
-                model=step_overrides["model"],
-                max_turns=step_overrides.get("max_turns", step.max_turns),
-                timeout=step_overrides.get("timeout", step.timeout),
-                parallel_over=step.parallel_over,
-                output_schema=step.output_schema,
-                retry=step.retry,
-                fallback=step.fallback,
-                csv_output=step.csv_output,
-                pdf_report=step.pdf_report,
-            )
+        overrides = {
+            k: step_overrides[k] for k in _STEP_OVERRIDE_FIELDS if k in step_overrides
+        }
+        if overrides:
+            step = replace(step, **overrides)
 
     # AutoPilot: pick variant if configured
     autopilot_experiment = None
@@ -682,14 +1306,6 @@ async def execute_step_with_retry(
 
     if step.autopilot and step.autopilot.enabled and step.autopilot.variants:
         try:
-            import random
-
-            from sandcastle.engine.autopilot import (
-                apply_variant,
-                get_or_create_experiment,
-                pick_variant,
-            )
-
             if random.random() <= step.autopilot.sample_rate:
                 experiment = await get_or_create_experiment(
                     workflow_name=context.workflow_name,
@@ -710,162 +1326,173 @@ async def execute_step_with_retry(
     max_attempts = step.retry.max_attempts if step.retry else 1
     backoff = step.retry.backoff if step.retry else "exponential"
 
-    # Record step as running
-    await _save_run_step(
-        run_id=context.run_id,
-        step_id=step.id,
-        status="running",
-        parallel_index=parallel_index,
+    # Record step as running, but only once it has outlasted
+    # _RUNNING_ROW_DELAY; short steps are written once, on completion
+    started_at = datetime.now(timezone.utc)
+    running_row = asyncio.get_running_loop().call_later(
+        _RUNNING_ROW_DELAY, _queue_running_step,
+        context.run_id, step.id, parallel_index, started_at,
     )
 
-    # Broadcast step.started event
-    event_bus.publish("step.started", {
-        "run_id": context.run_id,
-        "step_name": step.id,
-        "workflow": context.workflow_name,
-    })
-
-    for attempt in range(1, max_attempts + 1):
-        result = await _execute_step_once(
-            step, context, sandbox, storage, parallel_index, attempt
-        )
+    # Any exit, including an exception or cancellation, stops the timer so a
+    # stale "running" row is never queued after the step has ended
+    try:
+        # Broadcast step.started event
+        event_bus.publish("step.started", {
+            "run_id": context.run_id,
+            "step_name": step.id,
+            "workflow": context.workflow_name,
+        })
 
-        if result.status == "completed":
-            # AutoPilot: evaluate and save sample
-            if autopilot_experiment and autopilot_variant:
-                try:
-                    from sandcastle.engine.autopilot import (
-                        evaluate_result,
-                        maybe_complete_experiment,
-                        save_sample,
-                    )
+        for attempt in range(1, max_attempts + 1):
+            result = await _execute_step_once(
+                step, context, sandbox, storage, parallel_index, attempt
+            )
 
-                    score = await evaluate_result(
-                        original_step.autopilot, original_step, result.output
-                    )
-                    await save_sample(
-                        experiment_id=autopilot_experiment.id,
-                        run_id=context.run_id,
-                        variant=autopilot_variant,
-                        output=result.output,
-                        quality_score=score,
+            if result.status == "completed":
+                # AutoPilot: evaluate and save sample
+                if autopilot_experiment and autopilot_variant:
+                    try:
+                        score = await evaluate_result(
+                            original_step.autopilot, original_step, result.output
+                        )
+                        await save_sample(
+                            experiment_id=autopilot_experiment.id,
+                            run_id=context.run_id,
+                            variant=autopilot_variant,
+                            output=result.output,
+                            quality_score=score,
+                            cost_usd=result.cost_usd,
+                            duration_seconds=result.duration_seconds,
+                        )
+                        await maybe_complete_experiment(
+                            autopilot_experiment.id, original_step.autopilot
+                        )
+                    except Exception as e:
+                        logger.warning(f"AutoPilot sample recording failed: {e}")
+
+                # Write CSV output if configured
+                if step.csv_output:
+                    try:
+                        _write_csv_output(step, result.output, context.run_id)
+                    except Exception as e:
+                        logger.warning(f"CSV export failed for step '{step.id}': {e}")
+
+                # Generate PDF report if configured
+                pdf_path = None
+                if step.pdf_report:
+                    try:
+                        pdf_path = _write_pdf_report(step, result.output, context.run_id)
+                    except Exception as e:
+                        logger.warning(f"PDF report failed for step '{step.id}': {e}")
+
+                # Store PDF artifact path in output_data for API access
+                if pdf_path and isinstance(result.output, dict):
+                    result.output["_pdf_artifact"] = pdf_path
+                elif pdf_path:
+                    result = StepResult(
+                        step_id=result.step_id,
+                        parallel_index=result.parallel_index,
+                        output={"result": result.output, "_pdf_artifact": pdf_path},
                         cost_usd=result.cost_usd,
                         duration_seconds=result.duration_seconds,
+                        status=result.status,
+                        attempt=result.attempt,
                     )
-                    await maybe_complete_experiment(
-                        autopilot_experiment.id, original_step.autopilot
-                    )
-                except Exception as e:
-                    logger.warning(f"AutoPilot sample recording failed: {e}")
-
-            # Write CSV output if configured
-            if step.csv_output:
-                try:
-                    _write_csv_output(step, result.output, context.run_id)
-                except Exception as e:
-                    logger.warning(f"CSV export failed for step '{step.id}': {e}")
-
-            # Generate PDF report if configured
-            pdf_path = None
-            if step.pdf_report:
-                try:
-                    pdf_path = _write_pdf_report(step, result.output, context.run_id)
-                except Exception as e:
-                    logger.warning(f"PDF report failed for step '{step.id}': {e}")
-
-            # Store PDF artifact path in output_data for API access
-            if pdf_path and isinstance(result.output, dict):
-                result.output["_pdf_artifact"] = pdf_path
-            elif pdf_path:
-                result = StepResult(
-                    step_id=result.step_id,
-                    parallel_index=result.parallel_index,
-                    output={"result": result.output, "_pdf_artifact": pdf_path},
+
+                # Record step completion
+                running_row.cancel()
+                await _save_run_step(
+                    run_id=context.run_id,
+                    step_id=step.id,
+                    status="completed",
+                    parallel_index=parallel_index,
+                    output=result.output,
                     cost_usd=result.cost_usd,
                     duration_seconds=result.duration_seconds,
-                    status=result.status,
-                    attempt=result.attempt,
+                    attempt=attempt,
+                    model=step.model,
+                    started_at=started_at,
                 )
 
-            # Record step completion
-            await _save_run_step(
-                run_id=context.run_id,
-                step_id=step.id,
-                status="completed",
-                parallel_index=parallel_index,
-                output=result.output,
-                cost_usd=result.cost_usd,
-                duration_seconds=result.duration_seconds,
-                attempt=attempt,
-                model=step.model,
-            )
-
-            # Broadcast step.completed event
-            event_bus.publish("step.completed", {
-                "run_id": context.run_id,
-                "step_name": step.id,
-                "status": "completed",
-                "cost_usd": result.cost_usd,
-                "duration_seconds": result.duration_seconds,
-            })
-
-            return result
-
-        # Last attempt - check for fallback
-        if attempt >= max_attempts:
-            on_failure = step.retry.on_failure if step.retry else "abort"
-
-            # Try fallback prompt if configured
-            if on_failure == "fallback" and step.fallback and step.fallback.prompt:
-                logger.info(f"Step '{step.id}' failed, trying fallback prompt")
-                fallback_result = await _execute_fallback(
-                    step, context, sandbox, storage, parallel_index, attempt
-                )
-                if fallback_result.status == "completed":
-                    await _save_run_step(
-                        run_id=context.run_id,
-                        step_id=step.id,
-                        status="completed",
-                        parallel_index=parallel_index,
-                        output=fallback_result.output,
-                        cost_usd=result.cost_usd + fallback_result.cost_usd,
-                        duration_seconds=result.duration_seconds + fallback_result.duration_seconds,
-                        attempt=attempt,
+                # Broadcast step.completed event
+                event_bus.publish("step.completed", {
+                    "run_id": context.run_id,
+                    "step_name": step.id,
+                    "status": "completed",
+                    "cost_usd": result.cost_usd,
+                    "duration_seconds": result.duration_seconds,
+                })
+
+                return result
+
+            # Last attempt - check for fallback
+            if attempt >= max_attempts:
+                on_failure = step.retry.on_failure if step.retry else "abort"
+
+                # Try fallback prompt if configured
+                if on_failure == "fallback" and step.fallback and step.fallback.prompt:
+                    logger.info(f"Step '{step.id}' failed, trying fallback prompt")
+                    fallback_result = await _execute_fallback(
+                        step, context, sandbox, storage, parallel_index, attempt
                     )
-                    return fallback_result
+                    if fallback_result.status == "completed":
+                        running_row.cancel()
+                        await _save_run_step(
+                            run_id=context.run_id,
+                            step_id=step.id,
+                            status="completed",
+                            parallel_index=parallel_index,
+                            output=fallback_result.output,
+                            cost_usd=result.cost_usd + fallback_result.cost_usd,
+                            duration_seconds=(
+                                result.duration_seconds + fallback_result.duration_seconds
+                            ),
+                            attempt=attempt,
+                            started_at=started_at,
+                        )
+                        return fallback_result
 
-            logger.warning(
-                f"Step '{step.id}' failed after {max_attempts} attempts: {result.error}"
-            )
-            # Record step failure
-            await _save_run_step(
-                run_id=context.run_id,
-                step_id=step.id,
-                status="failed",
-                parallel_index=parallel_index,
-                cost_usd=result.cost_usd,
-                duration_seconds=result.duration_seconds,
-                attempt=attempt,
-                error=result.error,
-                model=step.model,
-            )
+                logger.warning(
+                    f"Step '{step.id}' failed after {max_attempts} attempts: {result.error}"
+                )
+                # Record step failure
+                running_row.cancel()
+                await _save_run_step(
+                    run_id=context.run_id,
+                    step_id=step.id,
+                    status="failed",
+                    parallel_index=parallel_index,
+                    cost_usd=result.cost_usd,
+                    duration_seconds=result.duration_seconds,
+                    attempt=attempt,
+                    error=result.error,
+                    model=step.model,
+                    started_at=started_at,
+                )
 
-            # Broadcast step.failed event
-            event_bus.publish("step.failed", {
-                "run_id": context.run_id,
-                "step_name": step.id,
-                "error": result.error,
-            })
+                # Broadcast step.failed event
+                event_bus.publish("step.failed", {
+                    "run_id": context.run_id,
+                    "step_name": step.id,
+                    "error": result.error,
+                })
 
-            return result
+                return result
 
-        delay = _backoff_delay(attempt, backoff)
-        logger.info(
-            f"Step '{step.id}' attempt {attempt} failed, retrying in {delay}s..."
-        )
-        await asyncio.sleep(delay)
+            # The backoff is the only sleep on the step path. Avoid adding
+            # sleep(0) yields or per-attempt client setup/teardown here: every
+            # await that suspends is another trip through the event loop for
+            # each step of each run.
+            delay = _backoff_delay(attempt, backoff)
+            logger.info(
+                f"Step '{step.id}' attempt {attempt} failed, retrying in {delay}s..."
+            )
+            await asyncio.sleep(delay)
 
-    return result  # Should not reach here
+        return result  # Should not reach here
+    finally:
+        running_row.cancel()
 
 
 async def _execute_fallback(
@@ -876,60 +1503,31 @@ async def _execute_fallback(
     parallel_index: int | None = None,
     attempt: int = 1,
 ) -> StepResult:
-    """Execute the fallback prompt for a step."""
-    started_at = datetime.now(timezone.utc)
-    try:
-        prompt = resolve_templates(step.fallback.prompt, context, step.depends_on)
-        prompt = await resolve_storage_refs(prompt, storage)
-        prompt = _STEP_SYSTEM_PREFIX + prompt
-
-        request: dict[str, Any] = {
-            "prompt": prompt,
-            "model": step.fallback.model,
-            "max_turns": step.max_turns,
-            "timeout": step.timeout,
-        }
-
-        logger.info(f"Executing fallback for step '{step.id}' (model={step.fallback.model})")
-        result = await sandbox.query(request)
-        output = result.structured_output if result.structured_output else result.text
-        if isinstance(output, str):
-            text = output.strip()
-            if text.startswith("```"):
-                first_nl = text.find("\n")
-                if first_nl >= 0:
-                    text = text[first_nl + 1:]
-                if text.endswith("```"):
-                    text = text[:-3].rstrip()
-            try:
-                parsed = json.loads(text)
-                if isinstance(parsed, (dict, list)):
-                    output = parsed
-            except (json.JSONDecodeError, ValueError):
-                pass
-        duration = (datetime.now(timezone.utc) - started_at).total_seconds()
+    """Execute the fallback prompt for a step.
 
-        return StepResult(
-            step_id=step.id,
-            parallel_index=parallel_index,
-            output=output,
-            cost_usd=result.total_cost_usd,
-            duration_seconds=duration,
-            status="completed",
-            attempt=attempt,
-        )
-    except Exception as e:
-        duration = (datetime.now(timezone.utc) - started_at).total_seconds()
-        logger.error(f"Fallback for step '{step.id}' also failed: {e}")
-        return StepResult(
-            step_id=step.id,
-            parallel_index=parallel_index,
-            cost_usd=0.0,
-            duration_seconds=duration,
-            status="failed",
-            error=f"Fallback failed: {e}",
-            attempt=attempt,
-        )
+    Runs through ``_execute_step_once`` with the fallback prompt and model, so
+    caching and policies apply as for the step itself. Model routing, the
+    output schema and PDF formatting belong to the primary prompt and are
+    dropped.
+    """
+    fallback_step = replace(
+        step,
+        prompt=step.fallback.prompt,
+        model=step.fallback.model,
+        retry=None,
+        output_schema=None,
+        pdf_report=None,
+        slo=None,
+        model_pool=None,
+    )
+    logger.info(f"Executing fallback for step '{step.id}' (model={step.fallback.model})")
+    result = await _execute_step_once(
+        fallback_step, context, sandbox, storage, parallel_index, attempt
+    )
+    if result.status == "failed":
+        logger.error(f"Fallback for step '{step.id}' also failed: {result.error}")
+        result.error = f"Fallback failed: {result.error}"
+    return result
 
 
 def _is_cacheable_output(output: Any) -> bool:
@@ -982,8 +1580,6 @@ def _compute_cache_key(
     model: str,
 ) -> str:
     """Compute a deterministic cache key for a step execution."""
-    import hashlib
-
     raw = f"{workflow_name}:{step_id}:{model}:{prompt}"
     return hashlib.sha256(raw.encode()).hexdigest()
 
@@ -991,16 +1587,14 @@ def _compute_cache_key(
 async def _get_cached_result(cache_key: str) -> dict | None:
     """Look up a cached step result. Returns output_data dict or None."""
     try:
-        from sqlalchemy import select as sa_select
-
-        from sandcastle.models.db import StepCache, async_session
+        db = _models_db()
 
         now = datetime.now(timezone.utc)
-        async with async_session() as session:
+        async with db.async_session() as session:
             row = await session.scalar(
-                sa_select(StepCache).where(
-                    StepCache.cache_key == cache_key,
-                    (StepCache.expires_at.is_(None)) | (StepCache.expires_at > now),
+                sa_select(db.StepCache).where(
+                    db.StepCache.cache_key == cache_key,
+                    (db.StepCache.expires_at.is_(None)) | (db.StepCache.expires_at > now),
                 )
             )
             if row:
@@ -1026,13 +1620,13 @@ async def _save_to_cache(
 ) -> None:
     """Save a step result to cache."""
     try:
-        from sandcastle.models.db import StepCache, async_session
+        db = _models_db()
 
         expires = datetime.now(timezone.utc) + timedelta(hours=ttl_hours)
         output_data = output if isinstance(output, dict) else {"result": output}
 
-        async with async_session() as session:
-            entry = StepCache(
+        async with db.async_session() as session:
+            entry = db.StepCache(
                 cache_key=cache_key,
                 workflow_name=workflow_name,
                 step_id=step_id,
@@ -1047,11 +1641,9 @@ async def _save_to_cache(
             except Exception:
                 await session.rollback()
                 # Key collision - update existing
-                from sqlalchemy import update as sa_update
-
                 await session.execute(
-                    sa_update(StepCache)
-                    .where(StepCache.cache_key == cache_key)
+                    sa_update(db.StepCache)
+                    .where(db.StepCache.cache_key == cache_key)
                     .values(
                         output_data=output_data,
                         cost_usd=cost_usd,
@@ -1073,7 +1665,7 @@ async def _execute_step_once(
     attempt: int = 1,
 ) -> StepResult:
     """Execute a single attempt of a step."""
-    started_at = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
 
     try:
         # SLO-based model selection (optimizer)
@@ -1082,13 +1674,6 @@ async def _execute_step_once(
         effective_max_turns = step.max_turns
         if hasattr(step, "slo") and step.slo and hasattr(step, "model_pool") and step.model_pool:
             try:
-                from sandcastle.engine.optimizer import (
-                    SLO,
-                    CostLatencyOptimizer,
-                    ModelOption,
-                    calculate_budget_pressure,
-                )
-
                 slo = SLO(
                     quality_min=step.slo.quality_min,
                     cost_max_usd=step.slo.cost_max_usd,
@@ -1125,7 +1710,7 @@ async def _execute_step_once(
         )
         cached = await _get_cached_result(cache_key)
         if cached:
-            duration = (datetime.now(timezone.utc) - started_at).total_seconds()
+            duration = time.perf_counter() - t0
             logger.info(
                 f"Step '{step.id}' cache HIT (key={cache_key[:12]}...)"
             )
@@ -1139,8 +1724,7 @@ async def _execute_step_once(
                 attempt=attempt,
             )
 
-        prompt = resolve_templates(step.prompt, context, step.depends_on)
-        prompt = await resolve_storage_refs(prompt, storage)
+        prompt = await resolve_prompt(step.prompt, context, storage, step.depends_on)
 
         if step.pdf_report:
             # PDF report steps need verbose, structured output - skip the terse
@@ -1157,10 +1741,7 @@ async def _execute_step_once(
             "timeout": step.timeout,
         }
         if step.output_schema:
-            request["output_format"] = {
-                "type": "json_schema",
-                "schema": step.output_schema,
-            }
+            request["output_format"] = step.output_format
 
         idx_str = f" [{parallel_index}]" if parallel_index is not None else ""
         logger.info(
@@ -1201,13 +1782,11 @@ async def _execute_step_once(
                     output = parsed
             except (json.JSONDecodeError, ValueError):
                 pass
-        duration = (datetime.now(timezone.utc) - started_at).total_seconds()
+        duration = time.perf_counter() - t0
 
         # Policy evaluation
         if hasattr(step, "policies") and step.policies is not None:
             try:
-                from sandcastle.engine.policy import PolicyEngine, resolve_step_policies
-
                 applicable = resolve_step_policies(step.policies, [])
                 if applicable:
                     engine = PolicyEngine(applicable)
@@ -1235,21 +1814,14 @@ async def _execute_step_once(
 
                     if eval_result.should_inject_approval:
                         # Reuse approval gate mechanism
-                        from sandcastle.models.db import (
-                            ApprovalRequest,
-                            ApprovalStatus,
-                            Run,
-                            RunStatus,
-                        )
-                        from sandcastle.models.db import (
-                            async_session as db_session,
-                        )
+                        db = _models_db()
                         config = eval_result.approval_config or {}
-                        async with db_session() as session:
-                            approval = ApprovalRequest(
+                        async with db.async_session() as session:
+                            approval = db.ApprovalRequest(
+                                id=uuid.uuid4(),
                                 run_id=uuid.UUID(context.run_id),
                                 step_id=step.id,
-                                status=ApprovalStatus.PENDING,
+                                status=db.ApprovalStatus.PENDING,
                                 request_data=(
                                     output if isinstance(output, dict)
                                     else {"result": output}
@@ -1262,16 +1834,14 @@ async def _execute_step_once(
                                 allow_edit=False,
                             )
                             if config.get("timeout_hours"):
-                                from datetime import timedelta
                                 approval.timeout_at = datetime.now(
                                     timezone.utc
                                 ) + timedelta(hours=config["timeout_hours"])
                             session.add(approval)
-                            run = await session.get(Run, uuid.UUID(context.run_id))
+                            run = await session.get(db.Run, uuid.UUID(context.run_id))
                             if run:
-                                run.status = RunStatus.AWAITING_APPROVAL
+                                run.status = db.RunStatus.AWAITING_APPROVAL
                             await session.commit()
-                            await session.refresh(approval)
                             approval_id = str(approval.id)
                         raise WorkflowPaused(
                             approval_id=approval_id, run_id=context.run_id
@@ -1313,7 +1883,7 @@ async def _execute_step_once(
         raise
 
     except (SandshoreError, Exception) as e:
-        duration = (datetime.now(timezone.utc) - started_at).total_seconds()
+        duration = time.perf_counter() - t0
         logger.error(f"Step '{step.id}' attempt {attempt} error: {e}")
         return StepResult(
             step_id=step.id,
@@ -1326,6 +1896,112 @@ async def _execute_step_once(
         )
 
 
+# Strong references to fire-and-forget tasks so they are not GC'd mid-flight
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _spawn_background(coro: Any) -> asyncio.Task:
+    """Run a coroutine in the background without awaiting it."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+class _StopFanOut(Exception):
+    """Raised inside a bounded fan-out to cancel the items still running."""
+
+
+async def _gather_bounded(
+    run: Callable[[Any, int], Awaitable[Any]],
+    items: list[Any],
+    limit: int,
+    stop: Callable[[Any], bool] | None = None,
+) -> list[Any]:
+    """Await ``run(item, index)`` for every item, at most *limit* at a time.
+
+    Like ``gather(..., return_exceptions=True)`` in item order, but a task is
+    only created once a slot is free, so a wide fan-out never holds more than
+    *limit* coroutine frames. When *stop* returns True for a result (or
+    exception), the remaining items are cancelled or never started and are
+    left as None.
+    """
+    results: list[Any] = [None] * len(items)
+    slots = asyncio.Semaphore(limit)
+
+    async def run_one(item: Any, index: int) -> None:
+        try:
+            results[index] = await run(item, index)
+        except Exception as e:
+            # Reported per item by the caller, never fails the group
+            results[index] = e
+        finally:
+            slots.release()
+        if stop is not None and stop(results[index]):
+            raise _StopFanOut
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for i, item in enumerate(items):
+                await slots.acquire()
+                tg.create_task(run_one(item, i))
+    except* _StopFanOut:
+        pass
+    return results
+
+
+async def drain_background_tasks() -> None:
+    """Wait for background writes and webhooks to finish (call on shutdown)."""
+    while _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+    await flush_run_steps()
+
+
+async def _write_run_result(storage: StorageBackend, path: str, content: str) -> None:
+    """Persist the final run outputs to storage."""
+    try:
+        await storage.write(path, content)
+    except Exception as e:
+        logger.error(f"Could not write run results to {path}: {e}")
+
+
+# Upper bound on one approval webhook delivery, retries included, so a slow
+# endpoint cannot hold up drain_background_tasks() at shutdown
+_APPROVAL_WEBHOOK_TIMEOUT = 60.0
+
+
+async def _dispatch_approval_webhook(
+    url: str,
+    run_id: str,
+    workflow: str,
+    outputs: dict,
+) -> None:
+    """Deliver the approval.requested webhook within _APPROVAL_WEBHOOK_TIMEOUT."""
+    try:
+        from sandcastle.webhooks.dispatcher import dispatch_webhook
+
+        async with asyncio.timeout(_APPROVAL_WEBHOOK_TIMEOUT):
+            await dispatch_webhook(
+                url=url,
+                event="approval.requested",
+                run_id=run_id,
+                workflow=workflow,
+                status="awaiting_approval",
+                outputs=outputs,
+            )
+    except TimeoutError:
+        logger.warning(
+            f"Approval webhook for run {run_id} timed out after "
+            f"{_APPROVAL_WEBHOOK_TIMEOUT:.0f}s"
+        )
+    except Exception as e:
+        logger.warning(f"Could not dispatch approval webhook: {e}")
+
+
+# Used for approval steps declared without an approval block
+_DEFAULT_APPROVAL_CONFIG = ApprovalConfig(message="Approval required")
+
+
 async def _execute_approval_step(
     step: StepDefinition,
     context: RunContext,
@@ -1335,18 +2011,13 @@ async def _execute_approval_step(
 
     Raises WorkflowPaused to halt execution until the approval is resolved.
     """
-    from sandcastle.models.db import (
-        ApprovalRequest,
-        ApprovalStatus,
-        Run,
-        RunStatus,
-        async_session,
-    )
+    db = _models_db()
+    cfg = step.approval_config or _DEFAULT_APPROVAL_CONFIG
 
     # Resolve show_data if configured
     request_data = None
-    if step.approval_config and step.approval_config.show_data:
-        request_data_val = resolve_variable(step.approval_config.show_data, context)
+    if cfg.show_data:
+        request_data_val = resolve_variable(cfg.show_data, context)
         if request_data_val is not None:
             if isinstance(request_data_val, dict):
                 request_data = request_data_val
@@ -1354,16 +2025,10 @@ async def _execute_approval_step(
                 request_data = {"value": request_data_val}
 
     # Calculate timeout
+    now = datetime.now(timezone.utc)
     timeout_at = None
-    if step.approval_config and step.approval_config.timeout_hours:
-        from datetime import timedelta
-        timeout_at = datetime.now(timezone.utc) + timedelta(
-            hours=step.approval_config.timeout_hours
-        )
-
-    on_timeout = step.approval_config.on_timeout if step.approval_config else "abort"
-    allow_edit = step.approval_config.allow_edit if step.approval_config else False
-    message = step.approval_config.message if step.approval_config else "Approval required"
+    if cfg.timeout_hours:
+        timeout_at = now + timedelta(hours=cfg.timeout_hours)
 
     # Save checkpoint before pausing
     await _save_checkpoint(context.run_id, step.id, stage_index, context)
@@ -1373,51 +2038,63 @@ async def _execute_approval_step(
         run_id=context.run_id,
         step_id=step.id,
         status="awaiting_approval",
+        now=now,
     )
 
-    # Create approval request
-    async with async_session() as session:
-        approval = ApprovalRequest(
+    # Create approval request. The id is assigned up front so it is known
+    # without reloading the row after commit.
+    async with db.async_session() as session:
+        approval = db.ApprovalRequest(
+            id=uuid.uuid4(),
             run_id=uuid.UUID(context.run_id),
             step_id=step.id,
-            status=ApprovalStatus.PENDING,
+            status=db.ApprovalStatus.PENDING,
             request_data=request_data,
-            message=message,
+            message=cfg.message,
             timeout_at=timeout_at,
-            on_timeout=on_timeout,
-            allow_edit=allow_edit,
+            on_timeout=cfg.on_timeout,
+            allow_edit=cfg.allow_edit,
         )
         session.add(approval)
 
         # Update run status to AWAITING_APPROVAL
-        run = await session.get(Run, uuid.UUID(context.run_id))
+        callback_url = None
+        workflow_name = ""
+        run = await session.get(db.Run, uuid.UUID(context.run_id))
         if run:
-            run.status = RunStatus.AWAITING_APPROVAL
+            run.status = db.RunStatus.AWAITING_APPROVAL
+            callback_url = run.callback_url
+            workflow_name = run.workflow_name or ""
         await session.commit()
-        await session.refresh(approval)
         approval_id = str(approval.id)
 
-    # Fire webhook
-    try:
-        from sandcastle.webhooks.dispatcher import dispatch_webhook
+    # Fire webhook in the background - the pause is already persisted
+    if callback_url:
+        _spawn_background(_dispatch_approval_webhook(
+            url=callback_url,
+            run_id=context.run_id,
+            workflow=workflow_name,
+            outputs={"approval_id": approval_id, "step_id": step.id, "message": cfg.message},
+        ))
 
-        run_obj = None
-        async with async_session() as session:
-            run_obj = await session.get(Run, uuid.UUID(context.run_id))
+    raise WorkflowPaused(approval_id=approval_id, run_id=context.run_id)
 
-        if run_obj and run_obj.callback_url:
-            await dispatch_webhook(
-                url=run_obj.callback_url,
-                event="approval.requested",
-                run_id=context.run_id,
-                workflow=run_obj.workflow_name or "",
-                status="awaiting_approval",
-                outputs={"approval_id": approval_id, "step_id": step.id, "message": message},
-            )
-    except Exception as e:
-        logger.warning(f"Could not dispatch approval webhook: {e}")
 
-    raise WorkflowPaused(approval_id=approval_id, run_id=context.run_id)
+@functools.lru_cache(maxsize=256)
+def _load_sub_workflow(
+    path: str, mtime_ns: int,
+) -> tuple[WorkflowDefinition, ExecutionPlan | None, tuple[str, ...]]:
+    """Parse, validate and plan a sub-workflow file, once per file version.
+
+    Keyed on the file's mtime so an edited YAML is picked up on the next
+    call. Returns the plan as None together with the validation errors
+    when the workflow is invalid.
+    """
+    sub_workflow = parse_yaml_string(Path(path).read_text())
+    errors = tuple(validate(sub_workflow))
+    if errors:
+        return sub_workflow, None, errors
+    return sub_workflow, build_plan(sub_workflow), ()
 
 
 async def _execute_sub_workflow_step(
@@ -1425,12 +2102,15 @@ async def _execute_sub_workflow_step(
     context: RunContext,
     storage: StorageBackend,
     depth: int = 0,
+    sandbox: SandshoreRuntime | None = None,
 ) -> StepResult:
-    """Execute a sub-workflow step, with optional fan-out."""
-    from sandcastle.config import settings
-    from sandcastle.engine.dag import build_plan, parse_yaml_string, validate
+    """Execute a sub-workflow step, with optional fan-out.
 
-    started_at = datetime.now(timezone.utc)
+    *sandbox* is the parent run's runtime, handed down to every child run.
+    """
+    settings = app_config.settings
+
+    t0 = time.perf_counter()
 
     if not step.sub_workflow or not step.sub_workflow.workflow:
         return StepResult(
@@ -1448,8 +2128,6 @@ async def _execute_sub_workflow_step(
 
     # Load and parse sub-workflow
     try:
-        from pathlib import Path
-
         workflows_dir = Path(settings.workflows_dir)
         wf_name = step.sub_workflow.workflow
         yaml_path = None
@@ -1468,10 +2146,9 @@ async def _execute_sub_workflow_step(
                 error=f"Sub-workflow '{wf_name}' not found",
             )
 
-        yaml_content = yaml_path.read_text()
-        sub_workflow = parse_yaml_string(yaml_content)
-
-        errors = validate(sub_workflow)
+        sub_workflow, sub_plan, errors = _load_sub_workflow(
+            str(yaml_path), yaml_path.stat().st_mtime_ns,
+        )
         if errors:
             return StepResult(
                 step_id=step.id,
@@ -1479,8 +2156,6 @@ async def _execute_sub_workflow_step(
                 error=f"Sub-workflow validation: {'; '.join(errors)}",
             )
 
-        sub_plan = build_plan(sub_workflow)
-
     except Exception as e:
         return StepResult(
             step_id=step.id, status="failed", error=f"Sub-workflow load error: {e}"
@@ -1491,6 +2166,9 @@ async def _execute_sub_workflow_step(
     for target_key, source_path in step.sub_workflow.input_mapping.items():
         sub_input[target_key] = resolve_variable(source_path, context)
 
+    # Child runs share the parent's cancel watch (None in local mode)
+    cancel_event = _cancel_events.get(context.run_id)
+
     # Fan-out if parallel_over is configured
     if step.sub_workflow.parallel_over:
         sub_fan_path = step.sub_workflow.parallel_over.strip("{}")
@@ -1498,26 +2176,25 @@ async def _execute_sub_workflow_step(
         if not isinstance(items, list):
             items = [items]
 
-        semaphore = asyncio.Semaphore(step.sub_workflow.max_concurrent)
-
         async def run_sub(item: Any, index: int) -> WorkflowResult:
-            async with semaphore:
-                item_input = {**sub_input, "_item": item, "_index": index}
-                sub_run_id = str(uuid.uuid4())
-                return await execute_workflow(
-                    workflow=sub_workflow,
-                    plan=sub_plan,
-                    input_data=item_input,
-                    run_id=sub_run_id,
-                    storage=storage,
-                    depth=depth + 1,
-                )
+            # execute_workflow merges this into its own input dict, so the
+            # shared mapped input is layered rather than copied per item
+            item_input = collections.ChainMap({"_item": item, "_index": index}, sub_input)
+            sub_run_id = str(uuid.uuid4())
+            return await execute_workflow(
+                workflow=sub_workflow,
+                plan=sub_plan,
+                input_data=item_input,
+                run_id=sub_run_id,
+                storage=storage,
+                depth=depth + 1,
+                sandbox=sandbox,
+                cancel_event=cancel_event,
+            )
 
-        tasks = [
-            asyncio.create_task(run_sub(item, i))
-            for i, item in enumerate(items)
-        ]
-        sub_results = await asyncio.gather(*tasks, return_exceptions=True)
+        sub_results = await _gather_bounded(
+            run_sub, items, step.sub_workflow.max_concurrent,
+        )
 
         # Aggregate outputs
         outputs = []
@@ -1531,23 +2208,15 @@ async def _execute_sub_workflow_step(
                 total_cost += r.total_cost_usd
                 sub_run_ids.append(r.run_id)
 
-        duration = (datetime.now(timezone.utc) - started_at).total_seconds()
+        duration = time.perf_counter() - t0
 
         # Apply output mapping if configured
         output = outputs
         if step.sub_workflow.output_mapping:
-            mapped = {}
-            for target, source in step.sub_workflow.output_mapping.items():
-                parts = source.split(".")
-                extracted = []
-                for o in outputs:
-                    val = o
-                    for p in parts:
-                        if isinstance(val, dict):
-                            val = val.get(p)
-                    extracted.append(val)
-                mapped[target] = extracted
-            output = mapped
+            output = {
+                target: extract(outputs)
+                for target, extract in step.sub_workflow.output_columns
+            }
 
         return StepResult(
             step_id=step.id,
@@ -1567,22 +2236,19 @@ async def _execute_sub_workflow_step(
             run_id=sub_run_id,
             storage=storage,
             depth=depth + 1,
+            sandbox=sandbox,
+            cancel_event=cancel_event,
         )
 
-        duration = (datetime.now(timezone.utc) - started_at).total_seconds()
+        duration = time.perf_counter() - t0
 
         # Apply output mapping
         output = sub_result.outputs
         if step.sub_workflow.output_mapping:
-            mapped = {}
-            for target, source in step.sub_workflow.output_mapping.items():
-                parts = source.split(".")
-                val = sub_result.outputs
-                for p in parts:
-                    if isinstance(val, dict):
-                        val = val.get(p)
-                mapped[target] = val
-            output = mapped
+            output = {
+                target: access(sub_result.outputs)
+                for target, access in step.sub_workflow.output_accessors
+            }
 
         status = "completed" if sub_result.status == "completed" else "failed"
         return StepResult(
@@ -1595,66 +2261,74 @@ async def _execute_sub_workflow_step(
         )
 
 
+def _fold_fan_in(strategy: str, acc: Any, output: Any) -> Any:
+    """Fold one fan-out item output into the step's accumulator.
+
+    - list: one entry per item (failed items are None)
+    - concat: list outputs are flattened, other outputs appended
+    - sum: numeric outputs (and numeric strings) are added, others ignored
+    - first / last: keep the first / last successful output
+    """
+    if strategy == "list":
+        acc.append(output)
+    elif strategy == "concat":
+        if isinstance(output, list):
+            acc.extend(output)
+        elif output is not None:
+            acc.append(output)
+    elif strategy == "sum":
+        if isinstance(output, str):
+            try:
+                output = float(output)
+            except ValueError:
+                return acc
+        if isinstance(output, (int, float)) and not isinstance(output, bool):
+            acc = output if acc is None else acc + output
+    elif strategy == "first":
+        if acc is None:
+            acc = output
+    elif output is not None:  # last
+        acc = output
+    return acc
+
+
 async def _prepare_and_run_step(
-    step_id: str,
+    step: StepDefinition,
     workflow: WorkflowDefinition,
     context: RunContext,
     sandbox: Any,
     storage: StorageBackend,
-    global_policies: list,
     step_overrides: dict[str, dict] | None,
     depth: int,
+    checkpoints: _LatestCheckpoint,
 ) -> None:
-    """Execute one step, update context in place. Raises on abort failure."""
-    step = workflow.get_step(step_id)
-    overrides = (step_overrides or {}).get(step_id)
+    """Execute one step, update context in place. Raises on abort failure.
+
+    *checkpoints* is the run's checkpoint slot; an approval gate takes its
+    stage index from it so its checkpoint sorts among the run's deltas.
+    """
+    step_id = step.id
+    overrides = step_overrides.get(step_id) if step_overrides else None
     use_dead_letter = (
         workflow.on_failure and workflow.on_failure.dead_letter
     )
-
-    # Resolve policies
-    if global_policies and step.policies is None:
-        step = StepDefinition(
-            id=step.id, prompt=step.prompt, depends_on=step.depends_on,
-            model=step.model, max_turns=step.max_turns, timeout=step.timeout,
-            parallel_over=step.parallel_over, output_schema=step.output_schema,
-            retry=step.retry, fallback=step.fallback, type=step.type,
-            approval_config=step.approval_config, autopilot=step.autopilot,
-            sub_workflow=step.sub_workflow, csv_output=step.csv_output,
-            pdf_report=step.pdf_report, policies=global_policies,
-        )
-    elif global_policies and step.policies:
-        try:
-            from sandcastle.engine.policy import resolve_step_policies
-            resolved = resolve_step_policies(step.policies, global_policies)
-            step = StepDefinition(
-                id=step.id, prompt=step.prompt, depends_on=step.depends_on,
-                model=step.model, max_turns=step.max_turns,
-                timeout=step.timeout,
-                parallel_over=step.parallel_over,
-                output_schema=step.output_schema,
-                retry=step.retry, fallback=step.fallback, type=step.type,
-                approval_config=step.approval_config,
-                autopilot=step.autopilot,
-                sub_workflow=step.sub_workflow, csv_output=step.csv_output,
-                pdf_report=step.pdf_report, policies=resolved,
-            )
-        except Exception as e:
-            logger.warning(f"Could not resolve step policies: {e}")
+    on_fail = step.retry.on_failure if step.retry else "abort"
 
     # Approval gate
     if step.type == "approval":
-        await _execute_approval_step(step, context, 0)
+        # The gate's full snapshot also covers a delta still waiting in the slot
+        checkpoints.supersede()
+        await _execute_approval_step(step, context, checkpoints.next_stage())
         return  # WorkflowPaused raised above
 
     # Sub-workflow
     if step.type == "sub_workflow":
         sub_result = await _execute_sub_workflow_step(
-            step, context, storage, depth=depth,
+            step, context, storage, depth=depth, sandbox=sandbox,
         )
-        context.costs.append(sub_result.cost_usd)
+        context.add_cost(sub_result.cost_usd)
         if sub_result.status == "completed":
-            context.step_outputs[step_id] = sub_result.output
+            context.set_output(step_id, sub_result.output)
             await _save_run_step(
                 run_id=context.run_id, step_id=step.id,
                 status="completed", output=sub_result.output,
@@ -1675,73 +2349,85 @@ async def _prepare_and_run_step(
         if not isinstance(items, list):
             items = [items]
 
-        tasks = [
-            asyncio.create_task(
-                execute_step_with_retry(
-                    step, context.with_item(item, i), sandbox, storage,
-                    parallel_index=i, step_overrides=overrides,
-                )
+        # Items render the same {storage.PATH} refs; fetch each path once
+        item_storage = _SharedReads(storage)
+
+        async def run_item(item: Any, index: int) -> StepResult:
+            return await execute_step_with_retry(
+                step, context.with_item(item, index), sandbox, item_storage,
+                parallel_index=index, step_overrides=overrides,
             )
-            for i, item in enumerate(items)
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
 
-        fan_out_items: list = []
+        def aborts(result: Any) -> bool:
+            return isinstance(result, Exception) or result.status == "failed"
+
+        # Bound items in flight so a huge list doesn't flood the cache/DB
+        # with work that would only queue on the sandbox limiter anyway.
+        # A failure that aborts the step cancels the remaining items at once.
+        results = await _gather_bounded(
+            run_item, items, step.max_concurrent or app_config.settings.max_parallel_items,
+            stop=aborts if on_fail == "abort" and not use_dead_letter else None,
+        )
+
+        fan_in = step.fan_in or "list"
+        fan_out_items: Any = [] if fan_in in ("list", "concat") else None
+        dead_letters: list[_DeadLetterEntry] = []
         for i, result in enumerate(results):
+            if result is None:
+                continue  # Cancelled or never started after an aborting failure
             if isinstance(result, Exception):
                 result = StepResult(
                     step_id=step_id, status="failed", error=str(result),
                 )
-            context.costs.append(result.cost_usd)
+            context.add_cost(result.cost_usd)
             if result.status == "failed":
-                on_fail = step.retry.on_failure if step.retry else "abort"
                 if use_dead_letter:
-                    await _send_to_dead_letter(
-                        run_id=context.run_id, step_id=step_id,
+                    dead_letters.append(_DeadLetterEntry(
                         error=result.error,
                         input_data={"_item_index": i},
                         attempts=result.attempt, parallel_index=i,
-                    )
-                    fan_out_items.append(None)
+                    ))
                 elif on_fail == "abort":
                     raise StepExecutionError(
                         f"Step '{step_id}' item {i} failed: {result.error}"
                     )
-                else:
+                if fan_in == "list":
                     fan_out_items.append(None)
             else:
-                fan_out_items.append(result.output)
-        context.step_outputs[step_id] = fan_out_items
+                fan_out_items = _fold_fan_in(fan_in, fan_out_items, result.output)
+        if dead_letters:
+            # One session and commit for all failed items of the fan-out
+            await _send_to_dead_letter(context.run_id, step_id, dead_letters)
+        context.set_output(step_id, fan_out_items)
         return
 
     # Regular step
     result = await execute_step_with_retry(
         step, context, sandbox, storage, step_overrides=overrides,
     )
-    context.costs.append(result.cost_usd)
-    if result.status == "failed":
-        on_fail = step.retry.on_failure if step.retry else "abort"
-        if use_dead_letter:
-            await _send_to_dead_letter(
-                run_id=context.run_id, step_id=step_id,
-                error=result.error, input_data=context.input,
-                attempts=result.attempt,
-            )
-            context.step_outputs[step_id] = None
-        elif on_fail == "abort":
-            raise StepExecutionError(
-                f"Step '{step_id}' failed: {result.error}"
-            )
-        else:
-            context.step_outputs[step_id] = None
-    else:
-        context.step_outputs[step_id] = result.output
+    context.add_cost(result.cost_usd)
+    if result.status != "failed":
+        context.set_output(step_id, result.output)
+        return
+
+    if use_dead_letter:
+        await _send_to_dead_letter(context.run_id, step_id, [_DeadLetterEntry(
+            error=result.error, input_data=context.input,
+            attempts=result.attempt,
+        )])
+    elif on_fail == "abort":
+        raise StepExecutionError(
+            f"Step '{step_id}' failed: {result.error}"
+        )
+    # Keep an explicit None: replay, fork and approval resume derive the
+    # steps to skip from the checkpointed output keys.
+    context.set_output(step_id, None)
 
 
 async def execute_workflow(
     workflow: WorkflowDefinition,
     plan: ExecutionPlan,
-    input_data: dict,
+    input_data: Mapping[str, Any],
     run_id: str | None = None,
     storage: StorageBackend | None = None,
     max_cost_usd: float | None = None,
@@ -1749,6 +2435,8 @@ async def execute_workflow(
     skip_steps: set[str] | None = None,
     step_overrides: dict[str, dict] | None = None,
     depth: int = 0,
+    sandbox: SandshoreRuntime | None = None,
+    cancel_event: asyncio.Event | None = None,
 ) -> WorkflowResult:
     """Execute a full workflow with parallel stages and retry logic.
 
@@ -1763,9 +2451,12 @@ async def execute_workflow(
         skip_steps: Set of step IDs to skip (already completed in replay).
         step_overrides: Per-step overrides for fork (e.g. {"score": {"model": "opus"}}).
         depth: Current nesting depth for hierarchical workflows.
+        sandbox: Runtime to reuse, passed down by a parent run to its
+            sub-workflows; looked up from settings when omitted.
+        cancel_event: Cancel event of a parent run, passed down to its
+            sub-workflows so they share the parent's cancel watch.
     """
-    from sandcastle.config import settings
-    from sandcastle.engine.storage import create_storage
+    settings = app_config.settings
 
     # Depth check for hierarchical workflows
     if depth >= settings.max_workflow_depth:
@@ -1798,72 +2489,28 @@ async def execute_workflow(
         workflow_name=workflow.name,
     )
 
-    # Restore context from checkpoint if doing replay/fork
+    # Restore context from checkpoint if doing replay/fork/resume
     if initial_context:
-        context.step_outputs = initial_context.get("step_outputs", {})
-        context.costs = initial_context.get("costs", [])
-
-    # Resolve global policies from workflow definition
-    global_policies = []
-    if hasattr(workflow, "policies") and workflow.policies:
-        try:
-            from sandcastle.engine.policy import (
-                PolicyAction as PEPolicyAction,
-            )
-            from sandcastle.engine.policy import (
-                PolicyDefinition as PEPolicyDefinition,
-            )
-            from sandcastle.engine.policy import (
-                PolicyPattern as PEPolicyPattern,
-            )
-            from sandcastle.engine.policy import (
-                PolicyTrigger as PEPolicyTrigger,
-            )
-            for gp in workflow.policies:
-                # Convert DAG dataclasses to policy engine dataclasses
-                pe_trigger = PEPolicyTrigger(
-                    type=gp.trigger.type,
-                    patterns=[
-                        PEPolicyPattern(type=p.type, pattern=p.pattern)
-                        for p in (gp.trigger.patterns or [])
-                    ] if gp.trigger.patterns else None,
-                    expression=gp.trigger.expression,
-                )
-                pe_action = PEPolicyAction(
-                    type=gp.action.type,
-                    replacement=gp.action.replacement,
-                    apply_to=gp.action.apply_to,
-                    approval_config=gp.action.approval_config,
-                    message=gp.action.message,
-                    notify=gp.action.notify,
-                )
-                global_policies.append(PEPolicyDefinition(
-                    id=gp.id,
-                    trigger=pe_trigger,
-                    action=pe_action,
-                    description=gp.description,
-                    severity=gp.severity,
-                ))
-        except Exception as e:
-            logger.warning(f"Could not load global policies: {e}")
+        context.restore(initial_context)
 
-    proxy_url = None
-    logger.info(
-        "Sandshore runtime: e2b_key=%s, proxy=%s",
-        "set" if settings.e2b_api_key else "unset",
-        proxy_url or "none",
-    )
-    sandbox = get_sandshore_runtime(
-        anthropic_api_key=settings.anthropic_api_key,
-        e2b_api_key=settings.e2b_api_key,
-        proxy_url=proxy_url,
-        template=settings.e2b_template,
-        max_concurrent=settings.max_concurrent_sandboxes,
-        sandbox_backend=settings.sandbox_backend,
-        docker_image=settings.docker_image,
-        docker_url=settings.docker_url or None,
-        cloudflare_worker_url=settings.cloudflare_worker_url,
-    )
+    if sandbox is None:
+        proxy_url = None
+        logger.info(
+            "Sandshore runtime: e2b_key=%s, proxy=%s",
+            "set" if settings.e2b_api_key else "unset",
+            proxy_url or "none",
+        )
+        sandbox = get_sandshore_runtime(
+            anthropic_api_key=settings.anthropic_api_key,
+            e2b_api_key=settings.e2b_api_key,
+            proxy_url=proxy_url,
+            template=settings.e2b_template,
+            max_concurrent=settings.max_concurrent_sandboxes,
+            sandbox_backend=settings.sandbox_backend,
+            docker_image=settings.docker_image,
+            docker_url=settings.docker_url or None,
+            cloudflare_worker_url=settings.cloudflare_worker_url,
+        )
 
     # Broadcast run.started event
     event_bus.publish("run.started", {
@@ -1872,11 +2519,11 @@ async def execute_workflow(
     })
 
     # Dependency-based scheduler: start steps as soon as deps complete
-    all_step_ids = [s.id for s in workflow.steps]
+    steps_by_id = plan.resolved_steps
+    all_step_ids = list(steps_by_id)
     step_deps = {s.id: set(s.depends_on) for s in workflow.steps}
     done_steps: set[str] = set(skip_steps or ())
     running: dict[str, asyncio.Task] = {}
-    checkpoint_counter = len(done_steps)
 
     for sid in done_steps:
         logger.info(f"Skipping step '{sid}' (replay/fork)")
@@ -1893,177 +2540,161 @@ async def execute_workflow(
         for t in running.values():
             t.cancel()
 
-    try:
-        while True:
-            # Cancel check
-            if await _check_cancel(run_id):
-                _cancel_running()
-                logger.info(f"Run {run_id} cancelled")
-                return WorkflowResult(
-                    run_id=run_id,
-                    outputs=context.step_outputs,
-                    total_cost_usd=context.total_cost,
-                    status="cancelled",
-                    started_at=started_at,
-                    completed_at=datetime.now(timezone.utc),
-                )
-
-            # Budget check
-            budget_status = _check_budget(context)
-            if budget_status == "exceeded":
-                _cancel_running()
-                cost = context.total_cost
-                limit = context.max_cost_usd
-                logger.warning(
-                    f"Run {run_id} budget exceeded "
-                    f"(${cost:.4f} / ${limit:.4f})"
-                )
-                return WorkflowResult(
-                    run_id=run_id,
-                    outputs=context.step_outputs,
-                    total_cost_usd=cost,
-                    status="budget_exceeded",
-                    error=f"Budget exceeded: ${cost:.4f} >= ${limit:.4f}",
-                    started_at=started_at,
-                    completed_at=datetime.now(timezone.utc),
-                )
-            elif budget_status == "warning":
-                logger.warning(
-                    f"Run {run_id} at 80%+ budget "
-                    f"(${context.total_cost:.4f} / "
-                    f"${context.max_cost_usd:.4f})"
-                )
-
-            # Launch ready steps
-            for sid in _find_ready():
-                running[sid] = asyncio.create_task(
-                    _prepare_and_run_step(
-                        sid, workflow, context, sandbox, storage,
-                        global_policies, step_overrides, depth,
-                    )
-                )
-
-            if not running:
-                break  # All steps done
-
-            # Wait for at least one step to finish
-            done_tasks, _ = await asyncio.wait(
-                running.values(),
-                return_when=asyncio.FIRST_COMPLETED,
-            )
+    # Outcome of the run; every branch below only sets these and the single
+    # WorkflowResult is built once teardown has run.
+    status = "completed"
+    error: str | None = None
+    completed_at: datetime | None = None
 
-            for task in done_tasks:
-                sid = next(k for k, v in running.items() if v is task)
-                del running[sid]
+    # Teardown unwinds in LIFO order on any exit, including cancellation of
+    # this coroutine: stop steps still running, then flush checkpoints and
+    # step records.
+    # The sandbox is a singleton client and is not closed per run.
+    async with contextlib.AsyncExitStack() as teardown:
+        # Step records are written in batches; make sure this run's are in
+        teardown.push_async_callback(flush_run_steps)
+
+        # Checkpoints are persisted by a background writer so slow DB writes
+        # do not hold up launching the next ready steps. Bursts are coalesced.
+        # Approval gates always save their own checkpoint, whatever the mode.
+        checkpoint_mode = workflow.checkpoint_mode
+        # Stage indexes continue after the checkpoints of the skipped steps
+        checkpoint_slot = _LatestCheckpoint(len(done_steps))
+        teardown.push_async_callback(
+            _close_checkpoint_writer,
+            checkpoint_slot,
+            asyncio.create_task(_checkpoint_writer(run_id, checkpoint_slot)),
+        )
+        # One subscription per run tree instead of a Redis GET per scheduler pass
+        await teardown.enter_async_context(_cancel_watch(run_id, cancel_event))
+        teardown.callback(_cancel_running)
 
-                exc = task.exception()
-                if exc is not None:
+        try:
+            while True:
+                # Cancel check
+                if await _check_cancel(run_id):
                     _cancel_running()
-                    if running:
-                        await asyncio.gather(
-                            *running.values(),
-                            return_exceptions=True,
-                        )
-                        running.clear()
-                    raise exc
-
-                done_steps.add(sid)
-                checkpoint_counter += 1
-                await _save_checkpoint(
-                    run_id, sid, checkpoint_counter, context,
-                )
+                    logger.info(f"Run {run_id} cancelled")
+                    status = "cancelled"
+                    break
 
-        completed_at = datetime.now(timezone.utc)
-
-        # Store results if configured
-        if workflow.on_complete and workflow.on_complete.storage_path:
-            storage_path = resolve_templates(workflow.on_complete.storage_path, context)
-            await storage.write(storage_path, json.dumps(context.step_outputs))
-
-        # Broadcast run.completed event
-        duration = (completed_at - started_at).total_seconds()
-        event_bus.publish("run.completed", {
-            "run_id": run_id,
-            "status": "completed",
-            "workflow": workflow.name,
-            "duration_seconds": duration,
-            "total_cost_usd": context.total_cost,
-        })
+                # Budget check
+                budget_status = _check_budget(context)
+                if budget_status == "exceeded":
+                    _cancel_running()
+                    cost = context.total_cost
+                    limit = context.max_cost_usd
+                    logger.warning(
+                        f"Run {run_id} budget exceeded "
+                        f"(${cost:.4f} / ${limit:.4f})"
+                    )
+                    status = "budget_exceeded"
+                    error = f"Budget exceeded: ${cost:.4f} >= ${limit:.4f}"
+                    break
+                elif budget_status == "warning":
+                    logger.warning(
+                        f"Run {run_id} at 80%+ budget "
+                        f"(${context.total_cost:.4f} / "
+                        f"${context.max_cost_usd:.4f})"
+                    )
 
-        return WorkflowResult(
-            run_id=run_id,
-            outputs=context.step_outputs,
-            total_cost_usd=context.total_cost,
-            status="completed",
-            started_at=started_at,
-            completed_at=completed_at,
-        )
+                # Launch ready steps
+                for sid in _find_ready():
+                    running[sid] = asyncio.create_task(
+                        _prepare_and_run_step(
+                            steps_by_id[sid], workflow, context, sandbox, storage,
+                            step_overrides, depth, checkpoint_slot,
+                        ),
+                        name=sid,
+                    )
 
-    except WorkflowPaused:
-        return WorkflowResult(
-            run_id=run_id,
-            outputs=context.step_outputs,
-            total_cost_usd=context.total_cost,
-            status="awaiting_approval",
-            error=None,
-            started_at=started_at,
-            completed_at=None,
-        )
+                if not running:
+                    break  # All steps done
 
-    except StepBlocked as e:
-        completed_at = datetime.now(timezone.utc)
-        event_bus.publish("run.failed", {
-            "run_id": run_id,
-            "workflow": workflow.name,
-            "error": f"Policy blocked: {e}",
-        })
-        return WorkflowResult(
-            run_id=run_id,
-            outputs=context.step_outputs,
-            total_cost_usd=context.total_cost,
-            status="failed",
-            error=f"Policy blocked: {e}",
-            started_at=started_at,
-            completed_at=completed_at,
-        )
+                # Wait for at least one step to finish
+                done_tasks, _ = await asyncio.wait(
+                    running.values(),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
 
-    except StepExecutionError as e:
-        completed_at = datetime.now(timezone.utc)
-        event_bus.publish("run.failed", {
-            "run_id": run_id,
-            "workflow": workflow.name,
-            "error": str(e),
-        })
-        return WorkflowResult(
-            run_id=run_id,
-            outputs=context.step_outputs,
-            total_cost_usd=context.total_cost,
-            status="failed",
-            error=str(e),
-            started_at=started_at,
-            completed_at=completed_at,
-        )
+                for task in done_tasks:
+                    sid = task.get_name()
+                    del running[sid]
+
+                    exc = task.exception()
+                    if exc is not None:
+                        _cancel_running()
+                        if running:
+                            await asyncio.gather(
+                                *running.values(),
+                                return_exceptions=True,
+                            )
+                            running.clear()
+                        raise exc
+
+                    done_steps.add(sid)
+                    stage_index = checkpoint_slot.next_stage()
+                    if checkpoint_mode == "per_step" and context.dirty_step_ids:
+                        # Nothing to persist when the step left no new output
+                        checkpoint_slot.publish(_CheckpointItem(
+                            sid, stage_index, context.delta_snapshot(),
+                        ))
+
+            completed_at = datetime.now(timezone.utc)
+
+            if status == "completed":
+                if checkpoint_mode == "final" and context.dirty_step_ids:
+                    checkpoint_slot.publish(_CheckpointItem(
+                        context.dirty_step_ids[-1], checkpoint_slot.stage_index,
+                        context.delta_snapshot(),
+                    ))
+
+                # Store results if configured. The write runs concurrently with the
+                # final checkpoint flush in the finally block instead of before it.
+                if workflow.on_complete and workflow.on_complete.storage_path:
+                    storage_path = resolve_templates(workflow.on_complete.storage_path, context)
+                    _spawn_background(_write_run_result(
+                        storage, storage_path, dumps_json(context.step_outputs),
+                    ))
+
+                # Broadcast run.completed event
+                duration = (completed_at - started_at).total_seconds()
+                event_bus.publish("run.completed", {
+                    "run_id": run_id,
+                    "status": "completed",
+                    "workflow": workflow.name,
+                    "duration_seconds": duration,
+                    "total_cost_usd": context.total_cost,
+                })
+
+        except WorkflowPaused:
+            # Paused runs are resumed later, so they are not stamped as completed
+            status = "awaiting_approval"
 
-    except Exception as e:
-        completed_at = datetime.now(timezone.utc)
-        logger.error(f"Workflow '{workflow.name}' failed: {e}")
-        event_bus.publish("run.failed", {
-            "run_id": run_id,
-            "workflow": workflow.name,
-            "error": str(e),
-        })
-        return WorkflowResult(
-            run_id=run_id,
-            outputs=context.step_outputs,
-            total_cost_usd=context.total_cost,
-            status="failed",
-            error=str(e),
-            started_at=started_at,
-            completed_at=completed_at,
-        )
+        except Exception as e:
+            status, completed_at = "failed", datetime.now(timezone.utc)
+            if isinstance(e, StepBlocked):
+                error = f"Policy blocked: {e}"
+            else:
+                error = str(e)
+                if not isinstance(e, StepExecutionError):
+                    # Step failures and policy blocks are expected; log anything else
+                    logger.error(f"Workflow '{workflow.name}' failed: {e}")
+            event_bus.publish("run.failed", {
+                "run_id": run_id,
+                "workflow": workflow.name,
+                "error": error,
+            })
 
-    finally:
-        pass  # Singleton client - not closed per run
+    return WorkflowResult(
+        run_id=run_id,
+        outputs=context.step_outputs,
+        total_cost_usd=context.total_cost,
+        status=status,
+        error=error,
+        started_at=started_at,
+        completed_at=completed_at,
+    )
 
 
 async def _save_routing_decision(
@@ -2074,8 +2705,7 @@ async def _save_routing_decision(
 ) -> None:
     """Save an optimizer routing decision to the database."""
     try:
-        from sandcastle.models.db import RoutingDecision as DBRoutingDecision
-        from sandcastle.models.db import async_session
+        db = _models_db()
 
         slo_data = None
         if slo_config:
@@ -2096,8 +2726,8 @@ async def _save_routing_decision(
             for a in decision.alternatives
         ]
 
-        async with async_session() as session:
-            rd = DBRoutingDecision(
+        async with db.async_session() as session:
+            rd = db.RoutingDecision(
                 run_id=uuid.UUID(run_id),
                 step_id=step_id,
                 selected_model=decision.selected_option.model,
@@ -2121,12 +2751,11 @@ async def _save_policy_violations(
 ) -> None:
     """Save policy violations to the database."""
     try:
-        from sandcastle.models.db import PolicyViolation as DBPolicyViolation
-        from sandcastle.models.db import async_session
+        db = _models_db()
 
-        async with async_session() as session:
+        async with db.async_session() as session:
             for v in violations:
-                pv = DBPolicyViolation(
+                pv = db.PolicyViolation(
                     run_id=uuid.UUID(run_id),
                     step_id=step_id,
                     policy_id=v.policy_id,
@@ -2141,38 +2770,46 @@ async def _save_policy_violations(
         logger.warning(f"Could not save policy violations for {step_id}: {e}")
 
 
+class _DeadLetterEntry(NamedTuple):
+    """A failed step (or fan-out item) bound for the dead letter queue."""
+
+    error: str | None
+    input_data: dict | None
+    attempts: int
+    parallel_index: int | None = None
+
+
 async def _send_to_dead_letter(
     run_id: str,
     step_id: str,
-    error: str | None,
-    input_data: dict | None,
-    attempts: int,
-    parallel_index: int | None = None,
+    entries: list[_DeadLetterEntry],
 ) -> None:
-    """Insert a failed step into the dead letter queue."""
+    """Insert failed items of a step into the dead letter queue in one transaction."""
     try:
-        from sandcastle.models.db import DeadLetterItem, async_session
-
-        async with async_session() as session:
-            dlq_item = DeadLetterItem(
-                run_id=uuid.UUID(run_id),
-                step_id=step_id,
-                parallel_index=parallel_index,
-                error=error,
-                input_data=input_data,
-                attempts=attempts,
-            )
-            session.add(dlq_item)
+        db = _models_db()
+        async with db.async_session() as session:
+            session.add_all([
+                db.DeadLetterItem(
+                    run_id=uuid.UUID(run_id),
+                    step_id=step_id,
+                    parallel_index=entry.parallel_index,
+                    error=entry.error,
+                    input_data=entry.input_data,
+                    attempts=entry.attempts,
+                )
+                for entry in entries
+            ])
             await session.commit()
 
         # Broadcast dlq.new event
-        event_bus.publish("dlq.new", {
-            "run_id": run_id,
-            "step_name": step_id,
-            "error": error,
-        })
+        for entry in entries:
+            event_bus.publish("dlq.new", {
+                "run_id": run_id,
+                "step_name": step_id,
+                "error": entry.error,
+            })
 
-        logger.info(f"Step '{step_id}' sent to dead letter queue")
+        logger.info(f"Step '{step_id}' sent {len(entries)} item(s) to dead letter queue")
     except Exception as e:
         logger.error(f"Failed to insert into dead letter queue: {e}")
 
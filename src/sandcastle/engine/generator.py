@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import re
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -10,7 +11,7 @@ from pathlib import Path
 import httpx
 import yaml
 
-from sandcastle.engine.dag import parse_yaml_string, validate
+from sandcastle.engine.dag import WorkflowDefinition, parse_yaml_string, validate
 from sandcastle.engine.providers import KNOWN_MODELS
 
 
@@ -38,23 +39,46 @@ _EXAMPLE_TEMPLATES = [
 ]
 
 
+@functools.lru_cache(maxsize=1)
 def _load_example_templates() -> str:
     """Load curated templates as few-shot examples for the system prompt."""
     templates_dir = Path(__file__).parent.parent / "templates"
     parts: list[str] = []
     for name in _EXAMPLE_TEMPLATES:
-        path = templates_dir / f"{name}.yaml"
-        if path.exists():
-            parts.append(f"--- Example: {name} ---\n{path.read_text()}")
+        try:
+            content = (templates_dir / f"{name}.yaml").read_text()
+        except FileNotFoundError:
+            continue
+        parts.append(f"--- Example: {name} ---\n{_strip_catalog_header(content)}")
     return "\n\n".join(parts)
 
 
+def _strip_catalog_header(content: str) -> str:
+    """Drop the leading ``# name/description/tags`` comment block of a template.
+
+    That block only feeds the template catalog and repeats the YAML's own
+    name and description, so it is dead weight in the system prompt.
+    """
+    lines = content.splitlines(keepends=True)
+    start = 0
+    while start < len(lines) and (
+        lines[start].startswith("#") or not lines[start].strip()
+    ):
+        start += 1
+    return "".join(lines[start:])
+
+
 # ---------------------------------------------------------------------------
 # System prompt
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=1)
 def _build_system_prompt() -> str:
-    """Build the system prompt with schema docs, model list, and examples."""
+    """Build the system prompt with schema docs, model list, and examples.
+
+    Its inputs (known models, bundled templates) are fixed for the life of the
+    process, so the prompt and its template reads happen once.
+    """
     models = ", ".join(sorted(KNOWN_MODELS))
     examples = _load_example_templates()
 
@@ -151,6 +175,31 @@ _MODEL = "claude-sonnet-4-20250514"
 _MAX_TOKENS = 4096
 _TIMEOUT = 60
 
+# One client per event loop so repeated generations reuse its TLS connections
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared Anthropic API client, creating it for the running loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=10),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client if it belongs to the running loop (call on shutdown)."""
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = _client_loop = None
+
 
 async def generate_workflow(
     description: str,
@@ -196,22 +245,21 @@ async def generate_workflow(
     else:
         user_msg = description
 
-    async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
-        resp = await client.post(
-            _API_URL,
-            headers={
-                "x-api-key": api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json",
-            },
-            json={
-                "model": _MODEL,
-                "max_tokens": _MAX_TOKENS,
-                "system": system_prompt,
-                "messages": [{"role": "user", "content": user_msg}],
-            },
-        )
-        resp.raise_for_status()
+    resp = await _get_client().post(
+        _API_URL,
+        headers={
+            "x-api-key": api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        },
+        json={
+            "model": _MODEL,
+            "max_tokens": _MAX_TOKENS,
+            "system": system_prompt,
+            "messages": [{"role": "user", "content": user_msg}],
+        },
+    )
+    resp.raise_for_status()
 
     data = resp.json()
     raw_text = data["content"][0]["text"]
@@ -221,25 +269,37 @@ async def generate_workflow(
 
     # Validate the generated YAML
     result = GenerateResult(yaml_content=yaml_content)
-    try:
-        wf = parse_yaml_string(yaml_content)
+    wf, errors = _parse_and_validate(yaml_content)
+    if wf is not None:
         result.name = wf.name
         result.description = wf.description
         result.steps_count = len(wf.steps)
         result.input_schema = wf.input_schema
-        errors = validate(wf)
-        result.validation_errors = errors
-    except Exception as exc:
-        result.validation_errors = [f"YAML parse error: {exc}"]
+    result.validation_errors = list(errors)
 
     return result
 
 
+@functools.lru_cache(maxsize=64)
+def _parse_and_validate(yaml_content: str) -> tuple[WorkflowDefinition | None, tuple[str, ...]]:
+    """Parse and validate generated YAML, memoized for repeated refine rounds."""
+    try:
+        wf = parse_yaml_string(yaml_content)
+        return wf, tuple(validate(wf))
+    except Exception as exc:
+        return None, (f"YAML parse error: {exc}",)
+
+
+# ```yaml ... ``` or ``` ... ```
+_FENCE_RE = re.compile(r"^```(?:ya?ml)?\s*\n(.*?)```\s*$", re.DOTALL)
+
+
 def _strip_fencing(text: str) -> str:
     """Remove markdown code fencing from generated YAML."""
     text = text.strip()
-    # Remove ```yaml ... ``` or ``` ... ```
-    m = re.match(r"^```(?:ya?ml)?\s*\n(.*?)```\s*$", text, re.DOTALL)
+    if not text.startswith("```"):
+        return text
+    m = _FENCE_RE.match(text)
     if m:
         return m.group(1).strip()
     return text
@@ -256,10 +316,16 @@ def generate_workflow_sync(
     refine_instruction: str | None = None,
 ) -> GenerateResult:
     """Synchronous wrapper around generate_workflow for CLI usage."""
-    return asyncio.run(
-        generate_workflow(
-            description,
-            refine_from=refine_from,
-            refine_instruction=refine_instruction,
-        )
-    )
+
+    async def _generate() -> GenerateResult:
+        # asyncio.run closes its loop, so the client cannot outlive this call
+        try:
+            return await generate_workflow(
+                description,
+                refine_from=refine_from,
+                refine_instruction=refine_instruction,
+            )
+        finally:
+            await close_client()
+
+    return asyncio.run(_generate())
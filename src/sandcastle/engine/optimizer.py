@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import logging
 import time
+from collections.abc import Callable
 from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
@@ -75,6 +76,34 @@ EXTENDED_MODEL_POOL = DEFAULT_MODEL_POOL + [
 ]
 
 
+# --- Scoring objectives: (quality, cost, latency) -> score, higher is better ---
+
+
+def _score_cost(q: float, c: float, latency: float) -> float:
+    return -c + (q * 0.1)
+
+
+def _score_quality(q: float, c: float, latency: float) -> float:
+    return q - (c * 0.1)
+
+
+def _score_latency(q: float, c: float, latency: float) -> float:
+    return -latency + (q * 0.1)
+
+
+def _score_balanced(q: float, c: float, latency: float) -> float:
+    return (q * 0.4) + (-c * 0.3 / 0.5) + (-latency * 0.3 / 120)
+
+
+# Resolved once per selection instead of branching on optimize_for per option
+_OBJECTIVES: dict[str, Callable[[float, float, float], float]] = {
+    "cost": _score_cost,
+    "quality": _score_quality,
+    "latency": _score_latency,
+    "balanced": _score_balanced,
+}
+
+
 # --- CostLatencyOptimizer ---
 
 
@@ -153,20 +182,14 @@ class CostLatencyOptimizer:
 
     def _score_options(self, options: list[ModelOption], slo: SLO) -> ModelOption:
         """Score options by optimization objective."""
+        objective = _OBJECTIVES.get(slo.optimize_for, _score_balanced)
 
         def score(option: ModelOption) -> float:
-            q = option.avg_quality or 0.5
-            c = option.avg_cost or 0.10
-            latency = option.avg_latency or 60.0
-
-            if slo.optimize_for == "cost":
-                return -c + (q * 0.1)
-            elif slo.optimize_for == "quality":
-                return q - (c * 0.1)
-            elif slo.optimize_for == "latency":
-                return -latency + (q * 0.1)
-            else:  # balanced
-                return (q * 0.4) + (-c * 0.3 / 0.5) + (-latency * 0.3 / 120)
+            return objective(
+                option.avg_quality or 0.5,
+                option.avg_cost or 0.10,
+                option.avg_latency or 60.0,
+            )
 
         return max(options, key=score)
 
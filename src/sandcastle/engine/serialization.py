@@ -0,0 +1,26 @@
+"""JSON encoding shared by result storage and the database layer."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+# Optional orjson for serializing large payloads
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def dumps_json(value: Any) -> str:
+    """Serialize a JSON payload, using orjson when it is installed."""
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(
+                value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            ).decode("utf-8")
+        except TypeError:
+            # e.g. integers beyond 64 bits; the stdlib encoder handles those
+            pass
+    return json.dumps(value)
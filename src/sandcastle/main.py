@@ -153,8 +153,13 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    from sandcastle.engine.executor import drain_background_tasks
+    from sandcastle.engine.generator import close_client as close_generator_client
     from sandcastle.models.db import engine
 
+    await drain_background_tasks()
+    await close_generator_client()
+
     if settings.scheduler_enabled:
         from sandcastle.queue.scheduler import stop_scheduler
 
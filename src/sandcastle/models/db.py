@@ -25,6 +25,7 @@ from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 from sandcastle.config import settings
+from sandcastle.engine.serialization import dumps_json
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -458,7 +459,9 @@ def _build_engine_url() -> str:
 def _build_engine_kwargs() -> dict:
     """Build engine kwargs based on database type."""
     url = _build_engine_url()
-    kwargs: dict = {"echo": False}
+    # JSON columns (checkpoints, outputs, DLQ inputs) are encoded with orjson
+    # when it is installed
+    kwargs: dict = {"echo": False, "json_serializer": dumps_json}
     if url.startswith("sqlite"):
         kwargs["connect_args"] = {"check_same_thread": False, "timeout": 30}
     return kwargs
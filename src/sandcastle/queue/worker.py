@@ -181,7 +181,10 @@ async def startup(ctx: dict) -> None:
 
 async def shutdown(ctx: dict) -> None:
     """Worker shutdown hook."""
+    from sandcastle.engine.executor import drain_background_tasks
+
     logger.info("Sandcastle worker shutting down")
+    await drain_background_tasks()
 
 
 class WorkerSettings:
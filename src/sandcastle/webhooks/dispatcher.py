@@ -97,29 +97,30 @@ async def dispatch_webhook(
         "X-Sandcastle-Event": event,
     }
 
-    for attempt in range(1, max_retries + 1):
-        try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
+    # One client (and its connection) serves every attempt of this delivery
+    async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
+        for attempt in range(1, max_retries + 1):
+            try:
                 response = await client.post(url, content=body, headers=headers)
 
-            if response.status_code < 400:
-                logger.info(
-                    f"Webhook delivered: {event} for run {run_id} "
-                    f"(status={response.status_code})"
-                )
-                return True
+                if response.status_code < 400:
+                    logger.info(
+                        f"Webhook delivered: {event} for run {run_id} "
+                        f"(status={response.status_code})"
+                    )
+                    return True
 
-            logger.warning(
-                f"Webhook attempt {attempt} got status {response.status_code} "
-                f"for {url}"
-            )
+                logger.warning(
+                    f"Webhook attempt {attempt} got status {response.status_code} "
+                    f"for {url}"
+                )
 
-        except httpx.HTTPError as e:
-            logger.warning(f"Webhook attempt {attempt} failed: {e}")
+            except httpx.HTTPError as e:
+                logger.warning(f"Webhook attempt {attempt} failed: {e}")
 
-        if attempt < max_retries:
-            delay = min(2**attempt, 30)
-            await asyncio.sleep(delay)
+            if attempt < max_retries:
+                delay = min(2**attempt, 30)
+                await asyncio.sleep(delay)
 
     logger.error(
         f"Webhook delivery failed after {max_retries} attempts: "
@@ -154,6 +154,100 @@ class TestApprovalExecution:
                 await _execute_approval_step(step, ctx, stage_index=1)
 
             assert exc_info.value.run_id == test_run_id
+            # The id is set before the insert, so the row is not reloaded
+            added = mock_session.add.call_args.args[0]
+            assert exc_info.value.approval_id == str(added.id)
+            mock_session.refresh.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_approval_step_without_config_uses_defaults(self):
+        step = StepDefinition(id="review", prompt="Review", type="approval")
+        ctx = RunContext(run_id="00000000-0000-0000-0000-000000000001", input={})
+
+        mock_session = AsyncMock()
+        mock_session.add = MagicMock()
+        mock_session.get = AsyncMock(return_value=None)
+
+        with (
+            patch("sandcastle.models.db.async_session") as mock_session_ctx,
+            patch("sandcastle.engine.executor._save_checkpoint", new_callable=AsyncMock),
+            patch("sandcastle.engine.executor._save_run_step", new_callable=AsyncMock),
+        ):
+            mock_session_ctx.return_value.__aenter__ = AsyncMock(return_value=mock_session)
+            mock_session_ctx.return_value.__aexit__ = AsyncMock(return_value=False)
+
+            with pytest.raises(WorkflowPaused):
+                await _execute_approval_step(step, ctx, stage_index=0)
+
+        approval = mock_session.add.call_args.args[0]
+        assert approval.message == "Approval required"
+        assert approval.on_timeout == "abort"
+        assert approval.allow_edit is False
+        assert approval.timeout_at is None
+        assert approval.request_data is None
+
+    @pytest.mark.asyncio
+    async def test_approval_webhook_gives_up_after_timeout(self):
+        import asyncio
+
+        from sandcastle.engine.executor import _dispatch_approval_webhook
+
+        async def hang(**kwargs):
+            await asyncio.sleep(3600)
+
+        with (
+            patch("sandcastle.webhooks.dispatcher.dispatch_webhook", side_effect=hang),
+            patch("sandcastle.engine.executor._APPROVAL_WEBHOOK_TIMEOUT", 0.01),
+        ):
+            # Returns (and logs) instead of hanging or raising
+            await _dispatch_approval_webhook("https://example.com/hook", "r1", "wf", {})
+
+    @pytest.mark.asyncio
+    async def test_approval_webhook_dispatched_in_background(self):
+        import asyncio
+        import uuid as _uuid
+
+        test_run_id = str(_uuid.uuid4())
+        step = StepDefinition(
+            id="review",
+            prompt="Review",
+            type="approval",
+            approval_config=ApprovalConfig(message="Please review"),
+        )
+        ctx = RunContext(run_id=test_run_id, input={})
+
+        mock_session = AsyncMock()
+        mock_session.add = MagicMock()
+
+        async def fake_refresh(obj):
+            obj.id = _uuid.uuid4()
+
+        mock_session.refresh = AsyncMock(side_effect=fake_refresh)
+        mock_run = MagicMock()
+        mock_run.callback_url = "https://example.com/hook"
+        mock_run.workflow_name = "test-workflow"
+        mock_session.get = AsyncMock(return_value=mock_run)
+
+        with (
+            patch("sandcastle.models.db.async_session") as mock_session_ctx,
+            patch("sandcastle.engine.executor._save_checkpoint", new_callable=AsyncMock),
+            patch("sandcastle.engine.executor._save_run_step", new_callable=AsyncMock),
+            patch(
+                "sandcastle.webhooks.dispatcher.dispatch_webhook", new_callable=AsyncMock
+            ) as mock_dispatch,
+        ):
+            mock_session_ctx.return_value.__aenter__ = AsyncMock(return_value=mock_session)
+            mock_session_ctx.return_value.__aexit__ = AsyncMock(return_value=False)
+
+            with pytest.raises(WorkflowPaused):
+                await _execute_approval_step(step, ctx, stage_index=1)
+
+            # Paused before the webhook ran; it completes on the next loop turn
+            mock_dispatch.assert_not_awaited()
+            await asyncio.sleep(0)
+            mock_dispatch.assert_awaited_once()
+            assert mock_dispatch.call_args.kwargs["url"] == "https://example.com/hook"
+            assert mock_session.get.await_count == 1
 
     def test_workflow_paused_exception_attributes(self):
         exc = WorkflowPaused(approval_id="ap-123", run_id="run-456")
@@ -216,3 +310,208 @@ steps:
         assert result.status == "awaiting_approval"
         assert result.outputs.get("prepare") == "prepared data"
         assert result.completed_at is None
+
+
+# --- Checkpoints around an approval gate ---
+
+
+GATED_COSTS_YAML = """
+name: gated-costs
+description: test
+steps:
+  - id: a
+    prompt: "A"
+  - id: b
+    depends_on: [a]
+    prompt: "B"
+  - id: review
+    type: approval
+    depends_on: [b]
+    approval_config:
+      message: "Review"
+  - id: c
+    depends_on: [review]
+    prompt: "C"
+"""
+
+GATE_BESIDE_SIBLING_YAML = """
+name: gate-beside-sibling
+description: test
+steps:
+  - id: fast
+    prompt: "Fast"
+  - id: slow
+    prompt: "Slow"
+  - id: review
+    type: approval
+    depends_on: [fast]
+    approval_config:
+      message: "Review"
+"""
+
+
+class TestApprovalCheckpoints:
+    @staticmethod
+    async def _materialized(session_factory, run_id: str) -> list[dict]:
+        """Load a run's checkpoints the way the replay/fork/resume routes do."""
+        import uuid as _uuid
+
+        from sqlalchemy import select
+
+        from sandcastle.engine.executor import flush_run_steps, materialize_checkpoints
+        from sandcastle.models.db import RunCheckpoint
+
+        await flush_run_steps()
+        async with session_factory() as session:
+            checkpoints = (await session.scalars(
+                select(RunCheckpoint)
+                .where(RunCheckpoint.run_id == _uuid.UUID(run_id))
+                .order_by(RunCheckpoint.stage_index.desc())
+            )).all()
+        return materialize_checkpoints([cp.context_snapshot for cp in reversed(checkpoints)])
+
+    @pytest.mark.asyncio
+    async def test_gate_checkpoint_sorts_after_earlier_deltas(self, tmp_path):
+        import uuid as _uuid
+
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from sandcastle.engine.dag import build_plan
+        from sandcastle.engine.executor import execute_workflow
+        from sandcastle.engine.sandshore import SandshoreResult
+        from sandcastle.models.db import Base
+
+        eng = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'gate.db'}")
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(eng, expire_on_commit=False)
+        workflow = parse_yaml_string(GATED_COSTS_YAML)
+        run_id = str(_uuid.uuid4())
+
+        with (
+            patch("sandcastle.models.db.async_session", session_factory),
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch("sandcastle.engine.executor._get_cached_result", return_value=None),
+            patch("sandcastle.engine.executor._save_to_cache", new_callable=AsyncMock),
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.return_value = SandshoreResult(text="ok", total_cost_usd=1.0)
+            mock_get_client.return_value = mock_sandbox
+
+            result = await execute_workflow(
+                workflow, build_plan(workflow), input_data={}, run_id=run_id,
+            )
+            assert result.status == "awaiting_approval"
+            snapshots = await self._materialized(session_factory, run_id)
+        await eng.dispose()
+
+        assert set(snapshots[-1]["step_outputs"]) == {"a", "b"}
+        assert sum(snapshots[-1]["costs"]) == pytest.approx(2.0)
+
+    @pytest.mark.asyncio
+    async def test_resume_does_not_recount_restored_costs(self, tmp_path):
+        import uuid as _uuid
+
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from sandcastle.engine.dag import build_plan
+        from sandcastle.engine.executor import execute_workflow
+        from sandcastle.engine.sandshore import SandshoreResult
+        from sandcastle.models.db import Base
+
+        eng = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'resume.db'}")
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(eng, expire_on_commit=False)
+        workflow = parse_yaml_string(GATED_COSTS_YAML)
+        plan = build_plan(workflow)
+        run_id = str(_uuid.uuid4())
+
+        with (
+            patch("sandcastle.models.db.async_session", session_factory),
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch("sandcastle.engine.executor._get_cached_result", return_value=None),
+            patch("sandcastle.engine.executor._save_to_cache", new_callable=AsyncMock),
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.return_value = SandshoreResult(text="ok", total_cost_usd=1.0)
+            mock_get_client.return_value = mock_sandbox
+
+            await execute_workflow(workflow, plan, input_data={}, run_id=run_id)
+
+            # Resume the same run the way the approval route does
+            initial_context = (await self._materialized(session_factory, run_id))[-1]
+            initial_context["step_outputs"]["review"] = {"approved": True}
+            result = await execute_workflow(
+                workflow, plan, input_data={}, run_id=run_id,
+                initial_context=initial_context,
+                skip_steps=list(initial_context["step_outputs"]),
+            )
+            snapshots = await self._materialized(session_factory, run_id)
+        await eng.dispose()
+
+        assert result.status == "completed"
+        assert result.total_cost_usd == pytest.approx(3.0)
+        assert set(snapshots[-1]["step_outputs"]) == {"a", "b", "review", "c"}
+        assert sum(snapshots[-1]["costs"]) == pytest.approx(3.0)
+
+    @pytest.mark.asyncio
+    async def test_gate_checkpoint_beside_running_sibling(self, tmp_path):
+        import asyncio
+        import uuid as _uuid
+
+        from sqlalchemy import select
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from sandcastle.engine import executor
+        from sandcastle.engine.dag import build_plan
+        from sandcastle.engine.executor import execute_workflow
+        from sandcastle.engine.sandshore import SandshoreResult
+        from sandcastle.models.db import Base, RunCheckpoint
+
+        eng = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sibling.db'}")
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(eng, expire_on_commit=False)
+        workflow = parse_yaml_string(GATE_BESIDE_SIBLING_YAML)
+        run_id = str(_uuid.uuid4())
+        gate_saved = asyncio.Event()
+        save_checkpoint = executor._save_checkpoint
+
+        async def query(request):
+            if request["prompt"].endswith("Slow"):
+                # Finish only once the gate has taken its snapshot
+                await gate_saved.wait()
+            return SandshoreResult(text="ok", total_cost_usd=1.0)
+
+        async def save_then_release(*args):
+            await save_checkpoint(*args)
+            gate_saved.set()
+            # Let the sibling finish and get its delta published before pausing
+            await asyncio.sleep(0.05)
+
+        with (
+            patch("sandcastle.models.db.async_session", session_factory),
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch("sandcastle.engine.executor._get_cached_result", return_value=None),
+            patch("sandcastle.engine.executor._save_to_cache", new_callable=AsyncMock),
+            patch("sandcastle.engine.executor._save_checkpoint", side_effect=save_then_release),
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.side_effect = query
+            mock_get_client.return_value = mock_sandbox
+
+            result = await execute_workflow(
+                workflow, build_plan(workflow), input_data={}, run_id=run_id,
+            )
+            snapshots = await self._materialized(session_factory, run_id)
+        async with session_factory() as session:
+            stage_indexes = (await session.scalars(select(RunCheckpoint.stage_index))).all()
+        await eng.dispose()
+
+        assert result.status == "awaiting_approval"
+        assert set(result.outputs) == {"fast", "slow"}
+        assert len(set(stage_indexes)) == len(stage_indexes)
+        assert set(snapshots[-1]["step_outputs"]) == {"fast", "slow"}
+        assert sum(snapshots[-1]["costs"]) == pytest.approx(result.total_cost_usd)
+        assert result.total_cost_usd == pytest.approx(2.0)
@@ -85,6 +85,24 @@ class TestE2BBackend:
             # When module is None, import will fail
             assert await backend.health() is False
 
+    @pytest.mark.asyncio
+    async def test_http_client_reused_and_closed(self):
+        backend = CloudflareBackend(worker_url="https://sandbox.example.workers.dev")
+
+        mock_resp = MagicMock()
+        mock_resp.json.return_value = {"ok": True}
+        mock_client = AsyncMock()
+        mock_client.get = AsyncMock(return_value=mock_resp)
+
+        with patch("httpx.AsyncClient", return_value=mock_client) as mock_cls:
+            assert await backend.health() is True
+            assert await backend.health() is True
+            await backend.close()
+
+        assert mock_cls.call_count == 1
+        assert mock_client.get.await_count == 2
+        mock_client.aclose.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_close_is_noop(self):
         backend = E2BBackend(e2b_api_key="key")
@@ -157,6 +157,13 @@ class TestParse:
         assert scrape.retry.max_attempts == 3
         assert scrape.retry.on_failure == "skip"
 
+    def test_output_format_built_once(self):
+        workflow = parse_yaml_string(FULL_WORKFLOW_YAML)
+        scrape = workflow.get_step("scrape")
+        assert scrape.output_format == {"type": "json_schema", "schema": scrape.output_schema}
+        assert scrape.output_format is scrape.output_format
+        assert parse_yaml_string(SIMPLE_WORKFLOW_YAML).get_step("step1").output_format is None
+
     def test_parse_depends_on(self):
         workflow = parse_yaml_string(SIMPLE_WORKFLOW_YAML)
         step4 = workflow.get_step("step4")
@@ -244,6 +251,62 @@ steps:
         errors = validate(workflow)
         assert any("Cycle" in e for e in errors)
 
+    def test_invalid_fan_in(self):
+        yaml_content = """
+name: bad-fan-in
+description: unknown reducer
+steps:
+  - id: step1
+    parallel_over: input.items
+    fan_in: median
+    prompt: "item {input._item}"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        errors = validate(workflow)
+        assert any("fan_in" in e for e in errors)
+
+    def test_valid_fan_in(self):
+        yaml_content = """
+name: good-fan-in
+description: concat reducer
+steps:
+  - id: step1
+    parallel_over: input.items
+    fan_in: concat
+    prompt: "item {input._item}"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        assert workflow.get_step("step1").fan_in == "concat"
+        assert validate(workflow) == []
+
+    def test_max_concurrent(self):
+        yaml_content = """
+name: bounded-fan-out
+description: per-step limit
+steps:
+  - id: step1
+    parallel_over: input.items
+    max_concurrent: 4
+    prompt: "item {input._item}"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        assert workflow.get_step("step1").max_concurrent == 4
+        assert validate(workflow) == []
+
+        workflow = parse_yaml_string(yaml_content.replace("4", "0"))
+        assert any("max_concurrent" in e for e in validate(workflow))
+
+    def test_checkpoint_mode(self):
+        workflow = parse_yaml_string(SIMPLE_WORKFLOW_YAML)
+        assert workflow.checkpoint_mode == "per_step"
+
+        workflow = parse_yaml_string(SIMPLE_WORKFLOW_YAML + "checkpoint_mode: final\n")
+        assert workflow.checkpoint_mode == "final"
+        assert validate(workflow) == []
+
+        workflow = parse_yaml_string(SIMPLE_WORKFLOW_YAML + "checkpoint_mode: sometimes\n")
+        assert any("checkpoint_mode" in e for e in validate(workflow))
+
 
 # --- Tests: build_plan ---
 
@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
 import csv
+import json
 import tempfile
+from datetime import datetime, timezone
 from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
@@ -18,13 +21,21 @@ from sandcastle.engine.dag import (
 )
 from sandcastle.engine.executor import (
     RunContext,
+    _backoff_delay,
+    _gather_bounded,
+    _SharedReads,
     _write_csv_output,
+    drain_background_tasks,
     execute_step_with_retry,
     execute_workflow,
+    materialize_checkpoints,
+    resolve_prompt,
+    resolve_storage_refs,
     resolve_templates,
     resolve_variable,
 )
-from sandcastle.engine.sandshore import SandshoreResult, SandshoreRuntime
+from sandcastle.engine.sandshore import SandshoreError, SandshoreResult, SandshoreRuntime
+from sandcastle.engine.serialization import dumps_json
 
 
 @pytest.fixture(autouse=True)
@@ -117,6 +128,23 @@ class TestResolveVariable:
         ctx = make_context()
         assert resolve_variable("unknown.path", ctx) is None
 
+    def test_step_output_list_index(self):
+        ctx = make_context(step_outputs={"scrape": {"items": [{"n": 1}, {"n": 2}]}})
+        assert resolve_variable("steps.scrape.output.items.1.n", ctx) == 2
+
+    def test_path_through_scalar_is_none(self):
+        ctx = make_context(step_outputs={"scrape": {"title": "Hello", "items": ["a"]}})
+        assert resolve_variable("steps.scrape.output.title.0", ctx) is None
+        assert resolve_variable("steps.scrape.output.title.x", ctx) is None
+        assert resolve_variable("steps.scrape.output.items.0.x", ctx) is None
+        assert resolve_variable("steps.scrape.output.missing.x", ctx) is None
+
+    def test_compiled_path_reused_across_contexts(self):
+        first = make_context(input={"name": "Acme"})
+        second = make_context(input={"name": "Globex"})
+        assert resolve_variable("input.name", first) == "Acme"
+        assert resolve_variable("input.name", second) == "Globex"
+
 
 # --- Tests: resolve_templates ---
 
@@ -152,6 +180,108 @@ class TestResolveTemplates:
         result = resolve_templates("Run: {run_id}", ctx)
         assert result == "Run: my-run"
 
+    def test_same_template_reused_across_contexts(self):
+        template = "results/{run_id}/{input.name}.json"
+        assert resolve_templates(template, make_context(run_id="a", input={"name": "x"})) == (
+            "results/a/x.json"
+        )
+        assert resolve_templates(template, make_context(run_id="b", input={"name": "y"})) == (
+            "results/b/y.json"
+        )
+
+    def test_repeated_placeholder_resolved_once(self):
+        ctx = make_context(step_outputs={"s": {"a": 1}})
+        with patch(
+            "sandcastle.engine.executor.resolve_variable", wraps=resolve_variable,
+        ) as spy:
+            result = resolve_templates(
+                "{steps.s.output} / {steps.s.output} / {unknown.x} {unknown.x}", ctx,
+            )
+        assert result == '{"a": 1} / {"a": 1} / {unknown.x} {unknown.x}'
+        assert spy.call_count == 2
+
+    def test_unreferenced_dependencies_injected(self):
+        template = "Use {steps.a.output}"
+        deps = ["a", "b"]
+        ctx = make_context(step_outputs={"a": "A", "b": "B"})
+        assert resolve_templates(template, ctx, deps) == (
+            "Use A\n\nContext from previous steps:\n[b]: B"
+        )
+        # Same template, dependency output not available in this context
+        assert resolve_templates(template, make_context(step_outputs={"a": "A"}), deps) == (
+            "Use A"
+        )
+
+
+class TestResolvePrompt:
+    @pytest.mark.asyncio
+    async def test_templates_and_storage_in_one_pass(self):
+        ctx = make_context(input={"name": "Acme"})
+        storage = AsyncMock()
+        storage.read.return_value = "stored notes"
+        result = await resolve_prompt(
+            "{input.name}: {storage.notes.md} / {storage.notes.md}", ctx, storage
+        )
+        assert result == "Acme: stored notes / stored notes"
+        storage.read.assert_awaited_once_with("notes.md")
+
+    @pytest.mark.asyncio
+    async def test_storage_reads_run_concurrently(self):
+        ctx = make_context()
+        in_flight = 0
+        peak = 0
+
+        async def slow_read(path):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return path.upper()
+
+        storage = AsyncMock()
+        storage.read.side_effect = slow_read
+        result = await resolve_prompt("{storage.a} {storage.b} {storage.c}", ctx, storage)
+        assert result == "A B C"
+        assert peak == 3
+
+        peak = 0
+        result = await resolve_storage_refs("{storage.a}+{storage.b}+{storage.a}", storage)
+        assert result == "A+B+A"
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_shared_reads_retry_after_failure(self):
+        storage = AsyncMock()
+        storage.read.side_effect = [OSError("flaky"), "ok"]
+        shared = _SharedReads(storage)
+        with pytest.raises(OSError):
+            await shared.read("a")
+        assert await shared.read("a") == "ok"
+        assert await shared.read("a") == "ok"
+        assert storage.read.await_count == 2
+
+        await shared.write("a", "new")
+        storage.write.assert_awaited_once_with("a", "new")
+        storage.read.side_effect = None
+        storage.read.return_value = "new"
+        assert await shared.read("a") == "new"
+
+    @pytest.mark.asyncio
+    async def test_missing_storage_ref_stays(self):
+        ctx = make_context()
+        storage = AsyncMock()
+        storage.read.return_value = None
+        result = await resolve_prompt("Use {storage.missing}", ctx, storage)
+        assert result == "Use {storage.missing}"
+
+    @pytest.mark.asyncio
+    async def test_injects_unreferenced_dependencies(self):
+        ctx = make_context(step_outputs={"scrape": {"k": "v"}})
+        storage = AsyncMock()
+        result = await resolve_prompt("Summarize", ctx, storage, depends_on=["scrape"])
+        assert result == 'Summarize\n\nContext from previous steps:\n[scrape]: {"k": "v"}'
+
 
 # --- Tests: execute_step_with_retry ---
 
@@ -238,6 +368,204 @@ class TestExecuteStepWithRetry:
         assert result.attempt == 1
         mock_sandbox.query.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_fork_overrides_keep_other_fields(self):
+        step = make_step(retry=RetryConfig(max_attempts=2, backoff="fixed", on_failure="abort"))
+        ctx = make_context()
+
+        mock_sandbox = AsyncMock(spec=SandshoreRuntime)
+        mock_sandbox.query.side_effect = [
+            Exception("fail 1"),
+            SandshoreResult(text="ok", total_cost_usd=0.01),
+        ]
+
+        mock_storage = AsyncMock()
+        mock_storage.read.return_value = None
+
+        with patch("sandcastle.engine.executor.asyncio.sleep", new_callable=AsyncMock):
+            result = await execute_step_with_retry(
+                step, ctx, mock_sandbox, mock_storage,
+                step_overrides={"prompt": "Forked prompt", "timeout": 42, "unknown": 1},
+            )
+
+        assert result.status == "completed"
+        assert result.attempt == 2  # retry config survived the override
+        request = mock_sandbox.query.call_args.args[0]
+        assert request["prompt"].endswith("Forked prompt")
+        assert request["timeout"] == 42
+
+    @pytest.mark.asyncio
+    async def test_running_row_deferred_for_fast_steps(self):
+        step = make_step()
+        ctx = make_context()
+
+        mock_sandbox = AsyncMock(spec=SandshoreRuntime)
+        mock_storage = AsyncMock()
+        mock_storage.read.return_value = None
+
+        async def slow_query(request):
+            await asyncio.sleep(0.05)
+            return SandshoreResult(text="ok", total_cost_usd=0.01)
+
+        with (
+            patch(
+                "sandcastle.engine.executor._save_run_step", new_callable=AsyncMock,
+            ) as mock_save,
+            patch("sandcastle.engine.executor._queue_running_step") as mock_running,
+        ):
+            mock_sandbox.query.return_value = SandshoreResult(text="ok", total_cost_usd=0.01)
+            await execute_step_with_retry(step, ctx, mock_sandbox, mock_storage)
+            # A fast step is written once, on completion
+            assert [c.kwargs["status"] for c in mock_save.call_args_list] == ["completed"]
+            assert mock_save.call_args.kwargs["started_at"] is not None
+            mock_running.assert_not_called()
+
+            mock_sandbox.query.side_effect = slow_query
+            with patch("sandcastle.engine.executor._RUNNING_ROW_DELAY", 0.01):
+                await execute_step_with_retry(step, ctx, mock_sandbox, mock_storage)
+            mock_running.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_running_row_not_queued_after_cancellation(self):
+        step = make_step()
+        ctx = make_context()
+
+        mock_sandbox = AsyncMock(spec=SandshoreRuntime)
+        mock_storage = AsyncMock()
+        mock_storage.read.return_value = None
+
+        async def hang(request):
+            await asyncio.sleep(3600)
+
+        mock_sandbox.query.side_effect = hang
+        with (
+            patch("sandcastle.engine.executor._save_run_step", new_callable=AsyncMock),
+            patch("sandcastle.engine.executor._queue_running_step") as mock_running,
+            patch("sandcastle.engine.executor._RUNNING_ROW_DELAY", 0.02),
+        ):
+            task = asyncio.create_task(
+                execute_step_with_retry(step, ctx, mock_sandbox, mock_storage)
+            )
+            await asyncio.sleep(0.005)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # Past the delay, the cancelled step still has no "running" row
+            await asyncio.sleep(0.05)
+        mock_running.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_fallback_prompt_after_failures(self):
+        from dataclasses import replace
+
+        from sandcastle.engine.dag import FallbackConfig
+
+        step = replace(
+            make_step(
+                retry=RetryConfig(max_attempts=1, on_failure="fallback"),
+                output_schema={"type": "object"},
+            ),
+            fallback=FallbackConfig(prompt="Simpler prompt", model="haiku"),
+        )
+        ctx = make_context()
+
+        mock_sandbox = AsyncMock(spec=SandshoreRuntime)
+        mock_sandbox.query.side_effect = [
+            Exception("primary failed"),
+            SandshoreResult(text='{"ok": true}', total_cost_usd=0.02),
+        ]
+        mock_storage = AsyncMock()
+        mock_storage.read.return_value = None
+
+        result = await execute_step_with_retry(step, ctx, mock_sandbox, mock_storage)
+
+        assert result.status == "completed"
+        assert result.output == {"ok": True}
+        request = mock_sandbox.query.call_args.args[0]
+        assert request["prompt"].endswith("Simpler prompt")
+        assert request["model"] == "haiku"
+        assert "output_format" not in request
+
+    @pytest.mark.asyncio
+    async def test_fallback_failure_is_labelled(self):
+        from dataclasses import replace
+
+        from sandcastle.engine.dag import FallbackConfig
+        from sandcastle.engine.executor import _execute_fallback
+
+        step = replace(make_step(), fallback=FallbackConfig(prompt="Simpler prompt"))
+        mock_sandbox = AsyncMock(spec=SandshoreRuntime)
+        mock_sandbox.query.side_effect = Exception("down")
+        mock_storage = AsyncMock()
+        mock_storage.read.return_value = None
+
+        result = await _execute_fallback(step, make_context(), mock_sandbox, mock_storage)
+
+        assert result.status == "failed"
+        assert result.error == "Fallback failed: down"
+
+
+class TestBackoffDelay:
+    @pytest.mark.parametrize(
+        ("attempt", "expected"),
+        [(1, 2), (2, 4), (5, 32), (6, 60), (50, 60)],
+    )
+    def test_exponential_schedule(self, attempt, expected):
+        assert _backoff_delay(attempt) == expected
+
+    def test_fixed(self):
+        assert _backoff_delay(7, "fixed") == 2.0
+
+
+class TestGatherBounded:
+    @pytest.mark.asyncio
+    async def test_tasks_created_only_when_a_slot_frees(self):
+        started: list[int] = []
+        release = asyncio.Event()
+
+        async def run(item, index):
+            started.append(index)
+            await release.wait()
+            if item == "bad":
+                raise ValueError("boom")
+            return item.upper()
+
+        baseline = len(asyncio.all_tasks())
+        gathering = asyncio.create_task(
+            _gather_bounded(run, ["a", "bad", "c", "d"], limit=2)
+        )
+        await asyncio.sleep(0.01)
+        # Only two items have been handed a task so far
+        assert started == [0, 1]
+        assert len(asyncio.all_tasks()) == baseline + 3  # gatherer and two items
+
+        release.set()
+        results = await gathering
+
+        assert started == [0, 1, 2, 3]
+        assert results[0] == "A"
+        assert isinstance(results[1], ValueError)
+        assert results[2:] == ["C", "D"]
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_remaining_items(self):
+        async def run(item, index):
+            if item == "bad":
+                raise ValueError("boom")
+            await asyncio.sleep(30)
+
+        results = await asyncio.wait_for(
+            _gather_bounded(
+                run, ["slow", "bad", "never"], limit=2,
+                stop=lambda r: isinstance(r, Exception),
+            ),
+            timeout=5,
+        )
+
+        assert results[0] is None  # cancelled
+        assert isinstance(results[1], ValueError)
+        assert results[2] is None  # never started
+
 
 # --- Tests: execute_workflow ---
 
@@ -346,6 +674,746 @@ steps:
         assert result.status == "failed"
         assert result.error is not None
 
+    @pytest.mark.asyncio
+    async def test_skipped_failure_recorded_as_none(self):
+        yaml_content = """
+name: skip-test
+description: test skip on failure
+steps:
+  - id: flaky
+    prompt: "This will fail"
+    retry:
+      max_attempts: 1
+      on_failure: skip
+  - id: after
+    depends_on: [flaky]
+    prompt: "Carry on"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+
+        with patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client:
+            mock_sandbox = AsyncMock()
+
+            async def fake_query(request):
+                if "Carry on" in request["prompt"]:
+                    return SandshoreResult(text="done")
+                raise SandshoreError("boom")
+
+            mock_sandbox.query.side_effect = fake_query
+            mock_get_client.return_value = mock_sandbox
+
+            result = await execute_workflow(workflow, plan, input_data={})
+
+        assert result.status == "completed"
+        # The key must exist so replay/resume treat the step as finished
+        assert "flaky" in result.outputs
+        assert result.outputs["flaky"] is None
+        assert result.outputs["after"] == "done"
+
+    @pytest.mark.asyncio
+    async def test_results_written_to_storage(self):
+        yaml_content = """
+name: stored
+description: test storage write
+steps:
+  - id: step1
+    prompt: "Hello"
+on_complete:
+  storage_path: results/{run_id}/output.json
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+
+        with (
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch("sandcastle.engine.storage.LocalStorage") as MockStorage,
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.return_value = SandshoreResult(text="Ahoj svete")
+            mock_get_client.return_value = mock_sandbox
+
+            mock_storage = AsyncMock()
+            mock_storage.read.return_value = None
+            MockStorage.return_value = mock_storage
+
+            result = await execute_workflow(workflow, plan, input_data={}, run_id="r1")
+            await drain_background_tasks()
+
+        assert result.status == "completed"
+        mock_storage.write.assert_awaited_once()
+        path, content = mock_storage.write.call_args.args
+        assert path == "results/r1/output.json"
+        assert json.loads(content) == {"step1": "Ahoj svete"}
+
+    @pytest.mark.asyncio
+    async def test_storage_failure_does_not_fail_run(self):
+        yaml_content = """
+name: stored
+description: test storage failure
+steps:
+  - id: step1
+    prompt: "Hello"
+on_complete:
+  storage_path: results/output.json
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+
+        with (
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch("sandcastle.engine.storage.LocalStorage") as MockStorage,
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.return_value = SandshoreResult(text="done")
+            mock_get_client.return_value = mock_sandbox
+
+            mock_storage = AsyncMock()
+            mock_storage.read.return_value = None
+            mock_storage.write.side_effect = OSError("disk full")
+            MockStorage.return_value = mock_storage
+
+            result = await execute_workflow(workflow, plan, input_data={})
+            await drain_background_tasks()
+
+        assert result.status == "completed"
+        mock_storage.write.assert_awaited_once()
+
+    def test_dumps_json_falls_back_for_big_integers(self):
+        payload = {"big": 2**70, "nested": {"items": [1, "two", None]}}
+        assert json.loads(dumps_json(payload)) == payload
+
+
+class TestCheckpointWriter:
+    @pytest.mark.asyncio
+    async def test_checkpoints_flushed_before_return(self):
+        yaml_content = """
+name: chain
+description: test chain
+steps:
+  - id: first
+    prompt: "First step"
+  - id: second
+    depends_on: [first]
+    prompt: "Second step"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+        written = []
+
+        async def slow_write(run_id, step_id, stage_index, snapshot):
+            await asyncio.sleep(0.01)
+            written.append((step_id, stage_index, snapshot))
+
+        with (
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch("sandcastle.engine.executor._write_checkpoint", side_effect=slow_write),
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.return_value = SandshoreResult(text="ok", total_cost_usd=0.01)
+            mock_get_client.return_value = mock_sandbox
+
+            result = await execute_workflow(workflow, plan, input_data={})
+
+        assert result.status == "completed"
+        # Intermediate checkpoints may be coalesced, the latest never is
+        assert written[-1][:2] == ("second", 2)
+        indexes = [stage_index for _, stage_index, _ in written]
+        assert indexes == sorted(set(indexes))
+        # Deltas only carry new outputs but materialize to the full context
+        assert all(snapshot["delta"] for _, _, snapshot in written)
+        full = materialize_checkpoints([snapshot for _, _, snapshot in written])
+        assert full[-1]["step_outputs"] == {"first": "ok", "second": "ok"}
+        assert "delta" not in full[-1]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(("mode", "expected"), [("final", 1), ("off", 0)])
+    async def test_checkpoint_mode(self, mode, expected):
+        yaml_content = f"""
+name: chain
+description: test chain
+checkpoint_mode: {mode}
+steps:
+  - id: first
+    prompt: "First step"
+  - id: second
+    depends_on: [first]
+    prompt: "Second step"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+
+        with (
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch(
+                "sandcastle.engine.executor._write_checkpoint", new_callable=AsyncMock
+            ) as mock_write,
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.return_value = SandshoreResult(text="ok")
+            mock_get_client.return_value = mock_sandbox
+
+            result = await execute_workflow(workflow, plan, input_data={})
+
+        assert result.status == "completed"
+        assert mock_write.await_count == expected
+        if expected:
+            _, step_id, stage_index, snapshot = mock_write.call_args.args
+            assert (step_id, stage_index) == ("second", 2)
+            assert snapshot["step_outputs"] == {"first": "ok", "second": "ok"}
+
+    @pytest.mark.asyncio
+    async def test_cancelling_run_stops_running_steps(self):
+        yaml_content = """
+name: slow
+description: test
+steps:
+  - id: slow
+    prompt: "Take forever"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+        started = asyncio.Event()
+        step_cancelled = asyncio.Event()
+
+        async def hang(request):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                step_cancelled.set()
+                raise
+
+        with (
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch("sandcastle.engine.executor._write_checkpoint", new_callable=AsyncMock),
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.side_effect = hang
+            mock_get_client.return_value = mock_sandbox
+
+            run = asyncio.create_task(execute_workflow(workflow, plan, input_data={}))
+            await asyncio.wait_for(started.wait(), 5)
+            run.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await run
+            await asyncio.wait_for(step_cancelled.wait(), 5)
+
+    @pytest.mark.asyncio
+    async def test_latest_checkpoint_supersedes_pending(self):
+        from sandcastle.engine.executor import (
+            _checkpoint_writer,
+            _CheckpointItem,
+            _LatestCheckpoint,
+        )
+
+        slot = _LatestCheckpoint()
+        written = []
+
+        async def fake_write(run_id, step_id, stage_index, snapshot):
+            written.append(step_id)
+
+        with patch("sandcastle.engine.executor._write_checkpoint", side_effect=fake_write):
+            slot.publish(_CheckpointItem("a", 1, {}))
+            slot.publish(_CheckpointItem("b", 2, {}))
+            slot.close()
+            await _checkpoint_writer("run", slot)
+
+        assert written == ["b"]
+
+    @pytest.mark.asyncio
+    async def test_superseded_delta_folded_into_latest(self):
+        from sandcastle.engine.executor import _CheckpointItem, _LatestCheckpoint
+
+        slot = _LatestCheckpoint()
+        slot.publish(_CheckpointItem(
+            "a", 1, {"delta": True, "step_outputs": {"a": 1}, "costs": [0.1]},
+        ))
+        slot.publish(_CheckpointItem(
+            "b", 2, {"delta": True, "step_outputs": {"b": 2}, "costs": [0.2]},
+        ))
+        assert slot.item.context_snapshot["step_outputs"] == {"a": 1, "b": 2}
+        assert slot.item.context_snapshot["costs"] == [0.1, 0.2]
+
+    def test_delta_snapshot_only_carries_new_costs(self):
+        ctx = RunContext(run_id="r", input={})
+        ctx.add_cost(0.1)
+        ctx.add_cost(0.2)
+        ctx.set_output("a", 1)
+        assert ctx.delta_snapshot()["costs"] == [0.1, 0.2]
+        ctx.add_cost(0.3)
+        ctx.set_output("b", 2)
+        delta = ctx.delta_snapshot()
+        assert delta["costs"] == [0.3]
+        assert delta["step_outputs"] == {"b": 2}
+        assert delta["total_cost"] == pytest.approx(0.6)
+
+    def test_first_snapshot_after_restore_is_full(self):
+        ctx = RunContext(run_id="r", input={})
+        ctx.restore({"step_outputs": {"a": 1}, "costs": [1.0, 2.0]})
+        ctx.add_cost(0.5)
+        ctx.set_output("b", 2)
+        first = ctx.delta_snapshot()
+        assert "delta" not in first
+        assert first["step_outputs"] == {"a": 1, "b": 2}
+        assert first["costs"] == [1.0, 2.0, 0.5]
+        ctx.add_cost(0.25)
+        ctx.set_output("c", 3)
+        assert ctx.delta_snapshot()["costs"] == [0.25]
+
+    def test_dirty_tracking_after_restore(self):
+        ctx = RunContext(run_id="r", input={})
+        ctx.set_output("stale", 0)
+        ctx.restore({"step_outputs": {"a": 1}, "costs": []})
+        assert ctx.dirty_step_ids == []
+        ctx.set_output("b", 1)
+        ctx.set_output("b", 2)
+        first = ctx.delta_snapshot()
+        assert "delta" not in first
+        assert first["step_outputs"] == {"a": 1, "b": 2}
+        assert ctx.dirty_step_ids == []
+        ctx.set_output("c", 3)
+        second = ctx.delta_snapshot()
+        assert second["delta"] is True
+        assert second["step_outputs"] == {"c": 3}
+        assert ctx.delta_snapshot()["step_outputs"] == {}
+
+    def test_delta_folded_into_pending_full_snapshot_stays_full(self):
+        from sandcastle.engine.executor import _CheckpointItem, _LatestCheckpoint
+
+        slot = _LatestCheckpoint()
+        slot.publish(_CheckpointItem("a", 1, {"step_outputs": {"a": 1}, "costs": [1.0]}))
+        slot.publish(_CheckpointItem(
+            "b", 2, {"delta": True, "step_outputs": {"b": 2}, "costs": [0.5]},
+        ))
+        assert "delta" not in slot.item.context_snapshot
+        assert slot.item.context_snapshot["costs"] == [1.0, 0.5]
+
+    def test_materialize_checkpoints_full_snapshot_resets_base(self):
+        snapshots = [
+            {"delta": True, "step_outputs": {"a": 1}, "costs": [0.1]},
+            {"delta": True, "step_outputs": {"b": 2}, "costs": [0.2]},
+            {"step_outputs": {"c": 3}, "costs": [0.5]},
+            {"delta": True, "step_outputs": {"d": 4}, "costs": [0.4]},
+        ]
+        full = materialize_checkpoints(snapshots)
+        assert [f["step_outputs"] for f in full] == [
+            {"a": 1},
+            {"a": 1, "b": 2},
+            {"c": 3},
+            {"c": 3, "d": 4},
+        ]
+        assert [f["costs"] for f in full] == [[0.1], [0.1, 0.2], [0.5], [0.5, 0.4]]
+
+
+class TestRunStepWriter:
+    @pytest.mark.asyncio
+    async def test_transitions_batched_into_one_row(self, tmp_path):
+        import uuid
+
+        from sqlalchemy import select
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from sandcastle.engine.executor import _save_run_step, flush_run_steps
+        from sandcastle.models.db import Base, RunStep, StepStatus
+
+        eng = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'steps.db'}")
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(eng, expire_on_commit=False)
+        run_id = str(uuid.uuid4())
+
+        with patch("sandcastle.models.db.async_session", session_factory):
+            await _save_run_step(run_id=run_id, step_id="a", status="running")
+            await _save_run_step(
+                run_id=run_id, step_id="a", status="completed",
+                output="done", cost_usd=0.5,
+            )
+            for i in range(3):
+                await _save_run_step(
+                    run_id=run_id, step_id="fan", status="running", parallel_index=i,
+                )
+            await flush_run_steps()
+            await _save_run_step(
+                run_id=run_id, step_id="fan", status="failed",
+                parallel_index=1, error="boom",
+            )
+            await _save_run_step(
+                run_id=run_id, step_id="quick", status="completed", output="fast",
+                started_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            )
+            await flush_run_steps()
+
+        async with session_factory() as session:
+            rows = (await session.scalars(select(RunStep))).all()
+        await eng.dispose()
+
+        by_key = {(r.step_id, r.parallel_index): r for r in rows}
+        assert len(rows) == 5
+        step = by_key[("a", None)]
+        assert step.status == StepStatus.COMPLETED
+        assert step.output_data == {"result": "done"}
+        assert step.cost_usd == 0.5
+        assert step.started_at is not None and step.completed_at is not None
+        assert by_key[("fan", 1)].status == StepStatus.FAILED
+        assert by_key[("fan", 1)].error == "boom"
+        assert by_key[("fan", 0)].status == StepStatus.RUNNING
+        quick = by_key[("quick", None)]
+        assert quick.status == StepStatus.COMPLETED
+        assert quick.started_at.replace(tzinfo=None) == datetime(2024, 1, 1)
+        assert quick.completed_at is not None
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_shares_commit_with_step_rows(self, tmp_path):
+        import uuid
+
+        from sqlalchemy import select
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from sandcastle.engine.executor import _save_run_step, _write_checkpoint
+        from sandcastle.models.db import Base, RunCheckpoint, RunStep
+
+        eng = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'cp.db'}")
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(eng, expire_on_commit=False)
+        sessions_opened = 0
+
+        def counting_session():
+            nonlocal sessions_opened
+            sessions_opened += 1
+            return session_factory()
+
+        run_id = str(uuid.uuid4())
+        with patch("sandcastle.models.db.async_session", counting_session):
+            await _save_run_step(run_id=run_id, step_id="a", status="completed", output="x")
+            await _save_run_step(run_id=run_id, step_id="b", status="completed", output="y")
+            await _write_checkpoint(run_id, "b", 2, {"step_outputs": {"a": "x", "b": "y"}})
+
+        async with session_factory() as session:
+            steps = (await session.scalars(select(RunStep))).all()
+            checkpoint = (await session.scalars(select(RunCheckpoint))).one()
+        await eng.dispose()
+
+        assert sessions_opened == 1
+        assert {s.step_id for s in steps} == {"a", "b"}
+        assert checkpoint.stage_index == 2
+        assert checkpoint.context_snapshot["step_outputs"]["b"] == "y"
+
+    @pytest.mark.asyncio
+    async def test_flush_does_not_wait_for_later_writes(self):
+        from sandcastle.engine.executor import _save_run_step, flush_run_steps
+
+        committed: list[str] = []
+
+        async def commit(batch):
+            committed.extend(w.run_id for w in batch)
+            await asyncio.sleep(0)
+            # Another run keeps queueing writes while this one flushes
+            await _save_run_step(run_id="other", step_id="busy", status="running")
+
+        with patch("sandcastle.engine.executor._commit_run_step_writes", side_effect=commit):
+            await _save_run_step(run_id="mine", step_id="a", status="completed")
+            await asyncio.wait_for(flush_run_steps(), timeout=1)
+
+        assert committed[0] == "mine"
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_retried_row_by_row(self, tmp_path, caplog):
+        import uuid
+
+        from sqlalchemy import select
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from sandcastle.engine.executor import _save_run_step, _write_checkpoint
+        from sandcastle.models.db import Base, RunCheckpoint, RunStep
+
+        eng = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'retry.db'}")
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(eng, expire_on_commit=False)
+
+        run_id = str(uuid.uuid4())
+        with patch("sandcastle.models.db.async_session", session_factory):
+            # Two bad writes queued alongside a good one fail the batch commit
+            await _save_run_step(run_id=run_id, step_id="a", status="completed", output="x")
+            await _save_run_step(run_id="not-a-uuid", step_id="b", status="completed")
+            await _write_checkpoint(run_id, "a", 1, {"step_outputs": {"a": object()}})
+
+        async with session_factory() as session:
+            steps = (await session.scalars(select(RunStep))).all()
+            checkpoints = (await session.scalars(select(RunCheckpoint))).all()
+        await eng.dispose()
+
+        assert [s.step_id for s in steps] == ["a"]
+        assert checkpoints == []
+        assert f"Lost checkpoint write for run {run_id} step a" in caplog.text
+        assert "Lost RunStep write for run not-a-uuid step b" in caplog.text
+
+
+class TestDeadLetter:
+    @pytest.mark.asyncio
+    async def test_dead_letter_entries_written(self, tmp_path):
+        import uuid
+
+        from sqlalchemy import select
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from sandcastle.engine.executor import _DeadLetterEntry, _send_to_dead_letter
+        from sandcastle.models.db import Base, DeadLetterItem
+
+        eng = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'dlq.db'}")
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(eng, expire_on_commit=False)
+        run_id = str(uuid.uuid4())
+
+        with patch("sandcastle.models.db.async_session", session_factory):
+            await _send_to_dead_letter(run_id, "fan", [
+                _DeadLetterEntry("boom", {"x": 1}, 3, parallel_index=0),
+                _DeadLetterEntry("bang", {"x": 2}, 3, parallel_index=2),
+            ])
+
+        async with session_factory() as session:
+            rows = (await session.scalars(select(DeadLetterItem))).all()
+        await eng.dispose()
+
+        assert sorted((r.parallel_index, r.error) for r in rows) == [(0, "boom"), (2, "bang")]
+
+
+class TestFanIn:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("fan_in", "outputs", "expected"),
+        [
+            (None, ["[1]", "[2, 3]"], [[1], [2, 3]]),
+            ("concat", ["[1]", "[2, 3]"], [1, 2, 3]),
+            ("sum", ["2", "3"], 5),
+            ("first", ["a", "b"], "a"),
+            ("last", ["a", "b"], "b"),
+        ],
+    )
+    async def test_fan_in_reducers(self, fan_in, outputs, expected):
+        fan_in_line = f"\n    fan_in: {fan_in}" if fan_in else ""
+        yaml_content = f"""
+name: fan-in
+description: test
+steps:
+  - id: fan
+    parallel_over: input.items{fan_in_line}
+    prompt: "Process {{input._item}}"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+
+        with patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client:
+            mock_sandbox = AsyncMock()
+            by_item = dict(zip(["x", "y"], outputs))
+
+            async def fake_query(request):
+                item = request["prompt"].rsplit("Process ", 1)[1]
+                return SandshoreResult(text=by_item[item], total_cost_usd=0.01)
+
+            mock_sandbox.query.side_effect = fake_query
+            mock_get_client.return_value = mock_sandbox
+
+            result = await execute_workflow(
+                workflow, plan, input_data={"items": ["x", "y"]}
+            )
+
+        assert result.status == "completed"
+        assert result.outputs["fan"] == expected
+
+    @pytest.mark.asyncio
+    async def test_items_in_flight_are_bounded(self):
+        from sandcastle.config import settings
+
+        yaml_content = """
+name: fan-bounded
+description: test
+steps:
+  - id: fan
+    parallel_over: input.items
+    prompt: "Process {input._item}"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+        in_flight = peak = 0
+
+        async def fake_query(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return SandshoreResult(text="ok", total_cost_usd=0.01)
+
+        with (
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch.object(settings, "max_parallel_items", 2),
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.side_effect = fake_query
+            mock_get_client.return_value = mock_sandbox
+
+            result = await execute_workflow(
+                workflow, plan, input_data={"items": list(range(6))}
+            )
+
+        assert result.status == "completed"
+        assert result.outputs["fan"] == ["ok"] * 6
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_step_max_concurrent_overrides_global_limit(self):
+        yaml_content = """
+name: fan-step-bounded
+description: test
+steps:
+  - id: fan
+    parallel_over: input.items
+    max_concurrent: 1
+    prompt: "Process {input._item}"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+        in_flight = peak = 0
+
+        async def fake_query(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return SandshoreResult(text="ok", total_cost_usd=0.01)
+
+        with patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client:
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.side_effect = fake_query
+            mock_get_client.return_value = mock_sandbox
+
+            result = await execute_workflow(
+                workflow, plan, input_data={"items": list(range(4))}
+            )
+
+        assert result.status == "completed"
+        assert result.outputs["fan"] == ["ok"] * 4
+        assert peak == 1
+
+    @pytest.mark.asyncio
+    async def test_items_share_storage_reads(self):
+        yaml_content = """
+name: fan-storage
+description: test
+steps:
+  - id: fan
+    parallel_over: input.items
+    prompt: "Use {storage.notes.md} for {input._item}"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+
+        with (
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch("sandcastle.engine.storage.LocalStorage") as MockStorage,
+        ):
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.return_value = SandshoreResult(text="ok", total_cost_usd=0.01)
+            mock_get_client.return_value = mock_sandbox
+            mock_storage = AsyncMock()
+            mock_storage.read.return_value = "notes"
+            MockStorage.return_value = mock_storage
+
+            result = await execute_workflow(
+                workflow, plan, input_data={"items": ["a", "b", "c"]}
+            )
+
+        assert result.status == "completed"
+        prompts = sorted(
+            c.args[0]["prompt"].rsplit("\n", 1)[-1] for c in mock_sandbox.query.call_args_list
+        )
+        assert prompts == ["Use notes for a", "Use notes for b", "Use notes for c"]
+        mock_storage.read.assert_awaited_once_with("notes.md")
+
+    @pytest.mark.asyncio
+    async def test_aborting_failure_cancels_slow_siblings(self):
+        yaml_content = """
+name: fan-abort
+description: test
+steps:
+  - id: fan
+    parallel_over: input.items
+    prompt: "Process {input._item}"
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+        slow_cancelled = asyncio.Event()
+
+        async def fake_query(request):
+            if request["prompt"].endswith("slow"):
+                try:
+                    await asyncio.sleep(30)
+                except asyncio.CancelledError:
+                    slow_cancelled.set()
+                    raise
+            raise SandshoreError("boom")
+
+        with patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client:
+            mock_sandbox = AsyncMock()
+            mock_sandbox.query.side_effect = fake_query
+            mock_get_client.return_value = mock_sandbox
+
+            result = await asyncio.wait_for(
+                execute_workflow(workflow, plan, input_data={"items": ["slow", "bad"]}),
+                timeout=5,
+            )
+
+        assert result.status == "failed"
+        assert "item 1 failed" in result.error
+        assert slow_cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_failed_items_sent_to_dead_letter_in_one_batch(self):
+        yaml_content = """
+name: fan-dlq
+description: test
+steps:
+  - id: fan
+    parallel_over: input.items
+    prompt: "Process {input._item}"
+on_failure:
+  dead_letter: true
+"""
+        workflow = parse_yaml_string(yaml_content)
+        plan = build_plan(workflow)
+
+        with (
+            patch("sandcastle.engine.executor.get_sandshore_runtime") as mock_get_client,
+            patch(
+                "sandcastle.engine.executor._send_to_dead_letter", new_callable=AsyncMock
+            ) as mock_dlq,
+        ):
+            mock_sandbox = AsyncMock()
+
+            async def fake_query(request):
+                if request["prompt"].endswith("ok"):
+                    return SandshoreResult(text="fine")
+                raise SandshoreError("boom")
+
+            mock_sandbox.query.side_effect = fake_query
+            mock_get_client.return_value = mock_sandbox
+
+            result = await execute_workflow(
+                workflow, plan, input_data={"items": ["bad", "ok", "worse"]}
+            )
+
+        assert result.status == "completed"
+        assert result.outputs["fan"] == [None, "fine", None]
+        mock_dlq.assert_awaited_once()
+        _, step_id, entries = mock_dlq.call_args.args
+        assert step_id == "fan"
+        assert [e.parallel_index for e in entries] == [0, 2]
+
 
 # --- Tests: _write_csv_output ---
 
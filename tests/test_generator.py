@@ -7,10 +7,12 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from sandcastle.engine.dag import parse_yaml_string
 from sandcastle.engine.generator import (
     GenerateResult,
     _build_system_prompt,
     _load_example_templates,
+    _strip_catalog_header,
     _strip_fencing,
     generate_workflow,
 )
@@ -50,6 +52,17 @@ class TestSystemPrompt:
         assert "social media" in prompt.lower()
         assert "curl" in prompt
 
+    def test_built_once(self):
+        """Templates are read once; later calls reuse the same prompt."""
+        _build_system_prompt.cache_clear()
+        with patch(
+            "sandcastle.engine.generator._load_example_templates", return_value="",
+        ) as mock_load:
+            first = _build_system_prompt()
+            assert _build_system_prompt() is first
+        mock_load.assert_called_once()
+        _build_system_prompt.cache_clear()
+
 
 # ---------------------------------------------------------------------------
 # Template loading
@@ -71,6 +84,22 @@ class TestTemplateLoading:
         assert "steps:" in examples
         assert "input_schema:" in examples
 
+    def test_catalog_header_stripped(self):
+        """Template catalog comments are not sent in the prompt."""
+        examples = _load_example_templates()
+        assert "# tags:" not in examples
+        assert "--- Example: research_agent ---\nname: research-agent\n" in examples
+        assert _strip_catalog_header("# name: X\n\nname: x\n# keep\n") == "name: x\n# keep\n"
+
+    def test_templates_read_once(self):
+        """Template files are read once per process."""
+        _load_example_templates.cache_clear()
+        with patch("pathlib.Path.read_text", return_value="steps: []") as mock_read:
+            first = _load_example_templates()
+            assert _load_example_templates() is first
+        assert mock_read.call_count == 4
+        _load_example_templates.cache_clear()
+
 
 # ---------------------------------------------------------------------------
 # Fencing strip
@@ -218,6 +247,55 @@ class TestGenerateWorkflow:
 
         assert len(result.validation_errors) > 0
 
+    @pytest.mark.asyncio
+    async def test_client_reused_across_calls(self):
+        """Generations on one loop share a single HTTP client."""
+        from sandcastle.engine.generator import close_client
+
+        with patch("sandcastle.engine.generator.httpx.AsyncClient") as mock_client_cls:
+            mock_client = AsyncMock()
+            mock_client.is_closed = False
+            mock_client.post.return_value = _mock_response(VALID_YAML)
+            mock_client_cls.return_value = mock_client
+
+            with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test-key"}):
+                await generate_workflow("First")
+                await generate_workflow("Second")
+            await close_client()
+
+        mock_client_cls.assert_called_once()
+        assert mock_client.post.await_count == 2
+        mock_client.aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_identical_yaml_parsed_once(self):
+        """Refine rounds that return the same YAML reuse the parse and validation."""
+        from sandcastle.engine.generator import _parse_and_validate, close_client
+
+        _parse_and_validate.cache_clear()
+        with (
+            patch("sandcastle.engine.generator.httpx.AsyncClient") as mock_client_cls,
+            patch(
+                "sandcastle.engine.generator.parse_yaml_string",
+                wraps=parse_yaml_string,
+            ) as mock_parse,
+        ):
+            mock_client = AsyncMock()
+            mock_client.is_closed = False
+            mock_client.post.return_value = _mock_response(INVALID_YAML)
+            mock_client_cls.return_value = mock_client
+
+            with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test-key"}):
+                first = await generate_workflow("First")
+                first.validation_errors.append("caller edit")
+                second = await generate_workflow("Second")
+            await close_client()
+
+        mock_parse.assert_called_once()
+        assert second.name == "bad-workflow"
+        assert "caller edit" not in second.validation_errors
+        assert second.validation_errors
+
     @pytest.mark.asyncio
     async def test_refine_includes_existing_yaml(self):
         """Refine mode should include existing YAML in the user message."""
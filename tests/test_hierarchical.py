@@ -69,6 +69,39 @@ class TestSubWorkflowParsing:
         step = workflow.get_step("sub_task")
         assert step.sub_workflow.output_mapping == {"result": "enriched"}
 
+    def test_output_accessors_compiled_once(self):
+        config = SubWorkflowConfig(
+            workflow="child",
+            output_mapping={"name": "enrich.name", "deep": "enrich.meta.tags"},
+        )
+        accessors = config.output_accessors
+        assert config.output_accessors is accessors
+        lookup = dict(accessors)
+
+        assert lookup["name"]({"enrich": {"name": "Acme"}}) == "Acme"
+        assert lookup["name"]({"enrich": {}}) is None
+        assert lookup["name"]({}) is None
+        assert lookup["name"](None) is None
+        # Parts that cannot apply to a non-dict value are skipped, as before
+        assert lookup["deep"]({"enrich": "plain text"}) == "plain text"
+
+    def test_output_columns_match_per_item_accessors(self):
+        config = SubWorkflowConfig(
+            workflow="child",
+            output_mapping={"name": "enrich.name", "deep": "enrich.meta"},
+        )
+        columns = dict(config.output_columns)
+        accessors = dict(config.output_accessors)
+
+        regular = [{"enrich": {"name": n, "meta": 1}} for n in "abc"]
+        assert columns["name"](regular) == ["a", "b", "c"]
+
+        # Failed items (None) and irregular shapes take the lenient walk
+        irregular = [*regular, None, {"enrich": "text"}, {}]
+        for target in ("name", "deep"):
+            assert columns[target](irregular) == [accessors[target](o) for o in irregular]
+        assert columns["name"]([]) == []
+
     def test_sub_workflow_step_gets_auto_prompt(self):
         workflow = parse_yaml_string(SUB_WORKFLOW_YAML)
         step = workflow.get_step("sub_task")
@@ -236,6 +269,124 @@ steps:
             assert result.output is not None
             assert result.cost_usd > 0
 
+    @pytest.mark.asyncio
+    async def test_fan_out_output_mapping(self):
+        """Each mapping collects its path from every item's outputs, in order."""
+        from sandcastle.engine.executor import WorkflowResult
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            (Path(tmpdir) / "child.yaml").write_text(
+                "name: child\ndescription: test\nsteps:\n"
+                "  - id: enrich\n    prompt: \"Enrich {input._item}\"\n"
+            )
+            step = StepDefinition(
+                id="sub",
+                prompt="sub-wf",
+                type="sub_workflow",
+                sub_workflow=SubWorkflowConfig(
+                    workflow="child",
+                    parallel_over="input.names",
+                    output_mapping={"names": "enrich.name", "raw": "enrich"},
+                ),
+            )
+            ctx = RunContext(run_id="parent", input={"names": ["a", "b", "c"]})
+
+            sandbox = AsyncMock()
+
+            async def fake_run(**kwargs):
+                # Child runs reuse the parent's runtime
+                assert kwargs["sandbox"] is sandbox
+                item = kwargs["input_data"]["_item"]
+                outputs = {"enrich": {"name": item.upper()}} if item != "b" else {}
+                return WorkflowResult(
+                    run_id=kwargs["run_id"], outputs=outputs,
+                    total_cost_usd=0.01, status="completed",
+                )
+
+            with (
+                patch("sandcastle.config.settings") as mock_settings,
+                patch("sandcastle.engine.executor.execute_workflow", side_effect=fake_run),
+            ):
+                mock_settings.max_workflow_depth = 5
+                mock_settings.workflows_dir = tmpdir
+
+                result = await _execute_sub_workflow_step(
+                    step, ctx, AsyncMock(), depth=0, sandbox=sandbox,
+                )
+
+        assert result.status == "completed"
+        assert result.output == {
+            "names": ["A", None, "C"],
+            "raw": [{"name": "A"}, None, {"name": "C"}],
+        }
+
+    @pytest.mark.asyncio
+    async def test_fan_out_items_see_mapped_input(self):
+        """Each child run gets the mapped input plus its own _item and _index."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            (Path(tmpdir) / "child.yaml").write_text(
+                "name: child\ndescription: test\nsteps:\n"
+                "  - id: work\n"
+                "    prompt: \"{input.company}/{input._item}/{input._index}\"\n"
+            )
+            step = StepDefinition(
+                id="sub",
+                prompt="sub-wf",
+                type="sub_workflow",
+                sub_workflow=SubWorkflowConfig(
+                    workflow="child",
+                    input_mapping={"company": "input.name"},
+                    parallel_over="input.items",
+                ),
+            )
+            ctx = RunContext(run_id="parent", input={"name": "Acme", "items": ["a", "b"]})
+            sandbox = AsyncMock()
+            sandbox.query.side_effect = lambda request: SandshoreResult(
+                text=request["prompt"], total_cost_usd=0.0,
+            )
+
+            with patch("sandcastle.config.settings") as mock_settings:
+                mock_settings.max_workflow_depth = 5
+                mock_settings.workflows_dir = tmpdir
+                mock_settings.redis_url = ""
+
+                result = await _execute_sub_workflow_step(
+                    step, ctx, AsyncMock(), depth=0, sandbox=sandbox,
+                )
+
+        assert result.status == "completed"
+        assert [o["work"].rsplit("\n", 1)[-1] for o in result.output] == [
+            "Acme/a/0", "Acme/b/1",
+        ]
+
+    def test_sub_workflow_plan_cached_per_file_version(self):
+        """Repeat loads of an unchanged file share one parsed plan."""
+        import os
+
+        from sandcastle.engine.executor import _load_sub_workflow
+
+        child_yaml = """
+name: child
+description: test child
+steps:
+  - id: child_step
+    prompt: "Process {input.company}"
+"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            child_path = Path(tmpdir) / "child.yaml"
+            child_path.write_text(child_yaml)
+            mtime_ns = child_path.stat().st_mtime_ns
+
+            first = _load_sub_workflow(str(child_path), mtime_ns)
+            assert _load_sub_workflow(str(child_path), mtime_ns) is first
+            assert first[1].stages == [["child_step"]]
+
+            # An edited file is reparsed under its new mtime
+            child_path.write_text(child_yaml.replace("name: child", "name: child-v2"))
+            os.utime(child_path, ns=(mtime_ns + 1_000_000, mtime_ns + 1_000_000))
+            edited = _load_sub_workflow(str(child_path), child_path.stat().st_mtime_ns)
+            assert edited[0].name == "child-v2"
+
 
 # --- Config ---
 
@@ -106,6 +106,42 @@ class TestSQLiteEngine:
         assert "api_keys" in tables
         assert "dead_letter_queue" in tables
 
+    @pytest.mark.asyncio
+    async def test_json_columns_round_trip(self, tmp_path, monkeypatch):
+        import uuid
+
+        monkeypatch.setenv("DATABASE_URL", "")
+        monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from sandcastle.models.db import (
+            Base,
+            DeadLetterItem,
+            _build_engine_kwargs,
+            _build_engine_url,
+        )
+
+        eng = create_async_engine(_build_engine_url(), **_build_engine_kwargs())
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        payload = {"_item_index": 3, "name": "Ahoj", "nested": [1, None, 2.5]}
+        session_factory = async_sessionmaker(eng, expire_on_commit=False)
+        async with session_factory() as session:
+            item = DeadLetterItem(
+                run_id=uuid.uuid4(), step_id="s1", error="boom",
+                input_data=payload, attempts=2,
+            )
+            session.add(item)
+            await session.commit()
+            item_id = item.id
+
+        async with session_factory() as session:
+            loaded = await session.get(DeadLetterItem, item_id)
+            assert loaded.input_data == payload
+
+        await eng.dispose()
+
 
 # --- In-process Queue ---
 
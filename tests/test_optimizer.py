@@ -207,6 +207,20 @@ async def test_score_optimize_latency():
     assert result.model == "haiku"
 
 
+@pytest.mark.asyncio
+async def test_score_unknown_objective_is_balanced():
+    """An unrecognised optimize_for scores like balanced."""
+    optimizer = CostLatencyOptimizer()
+    options = [
+        _make_option("haiku", "haiku", avg_quality=0.5, avg_cost=0.02, avg_latency=100),
+        _make_option("sonnet", "sonnet", avg_quality=0.9, avg_cost=0.05, avg_latency=20),
+        _make_option("opus", "opus", avg_quality=0.95, avg_cost=0.50, avg_latency=90),
+    ]
+    balanced = optimizer._score_options(options, SLO(optimize_for="balanced"))
+    assert balanced.model == "sonnet"
+    assert optimizer._score_options(options, SLO(optimize_for="other")) is balanced
+
+
 # --- SLO filtering ---
 
 
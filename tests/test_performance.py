@@ -232,3 +232,35 @@ class TestRateLimitIntegration:
         assert exc_info.value.status_code == 429
         assert "Rate limit exceeded" in str(exc_info.value.detail)
         assert exc_info.value.headers["Retry-After"] == "60"
+
+
+# ---- Webhook Dispatcher Tests ----
+
+
+class TestWebhookDispatcher:
+    @pytest.mark.asyncio
+    async def test_retries_reuse_one_client(self):
+        from unittest.mock import AsyncMock, patch
+
+        from sandcastle.webhooks.dispatcher import dispatch_webhook
+
+        mock_client = AsyncMock()
+        mock_client.__aenter__.return_value = mock_client
+        mock_client.post.side_effect = [
+            MagicMock(status_code=503),
+            MagicMock(status_code=200),
+        ]
+
+        with (
+            patch("sandcastle.webhooks.dispatcher.validate_callback_url"),
+            patch("httpx.AsyncClient", return_value=mock_client) as mock_cls,
+            patch("sandcastle.webhooks.dispatcher.asyncio.sleep", new_callable=AsyncMock),
+        ):
+            delivered = await dispatch_webhook(
+                url="https://example.com/hook", event="run.completed",
+                run_id="r1", workflow="wf", status="completed",
+            )
+
+        assert delivered is True
+        assert mock_client.post.await_count == 2
+        mock_cls.assert_called_once()
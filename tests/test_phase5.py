@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from unittest.mock import AsyncMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -13,10 +14,35 @@ from sandcastle.engine.dag import (
 from sandcastle.engine.executor import (
     RunContext,
     _check_budget,
+    _check_cancel,
     execute_workflow,
 )
 from sandcastle.engine.sandshore import SandshoreResult
 
+
+class FakePubSub:
+    """Stand-in for a redis.asyncio PubSub that delivers queued messages."""
+
+    def __init__(self, published):
+        self.published = published
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def subscribe(self, channel):
+        self.channel = channel
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            data = await asyncio.wait_for(self.published.get(), timeout)
+        except TimeoutError:
+            return None
+        return {"type": "message", "channel": self.channel, "data": data}
+
+
 # --- Budget checks ---
 
 
@@ -45,6 +71,31 @@ class TestBudgetCheck:
         ctx = RunContext(run_id="r1", input={}, costs=[1.5], max_cost_usd=1.0)
         assert _check_budget(ctx) == "exceeded"
 
+    def test_budget_tracks_appended_costs(self):
+        ctx = RunContext(run_id="r1", input={}, costs=[0.5], max_cost_usd=1.0)
+        assert _check_budget(ctx) is None
+        ctx.add_cost(0.35)
+        assert _check_budget(ctx) == "warning"
+        ctx.restore({"costs": [1.2]})
+        assert _check_budget(ctx) == "exceeded"
+        assert ctx.total_cost == 1.2
+
+    def test_add_cost_keeps_total_current(self):
+        ctx = RunContext(run_id="r1", input={}, costs=[0.25], max_cost_usd=1.0)
+        assert ctx.total_cost == 0.25
+        ctx.add_cost(0.5)
+        ctx.add_cost(0.25)
+        assert ctx.costs == [0.25, 0.5, 0.25]
+        assert ctx.total_cost == 1.0
+        assert _check_budget(ctx) == "exceeded"
+
+        # A fan-out child starts from the run's spend without touching it
+        child = ctx.with_item("x", 0)
+        assert child.total_cost == 1.0
+        child.add_cost(0.5)
+        assert ctx.total_cost == 1.0
+        assert ctx.costs == [0.25, 0.5, 0.25]
+
 
 # --- Context snapshot ---
 
@@ -73,6 +124,19 @@ class TestRunContext:
         child = ctx.with_item({"key": "val"}, 0)
         assert child.max_cost_usd == 5.0
 
+    def test_with_item_reads_parent_outputs_without_copying(self):
+        ctx = RunContext(run_id="r1", input={}, step_outputs={"step1": "output1"})
+        child = ctx.with_item({"key": "val"}, 0)
+        assert child.step_outputs["step1"] == "output1"
+
+        child.step_outputs["local"] = "child only"
+        assert "local" not in ctx.step_outputs
+        ctx.step_outputs["step2"] = "output2"
+        assert child.step_outputs["step2"] == "output2"
+        assert child.snapshot()["step_outputs"] == {
+            "step1": "output1", "step2": "output2", "local": "child only",
+        }
+
 
 # --- Budget workflow execution ---
 
@@ -182,6 +246,87 @@ steps:
         assert result.status == "cancelled"
         assert "step1" in result.outputs
 
+    @pytest.mark.asyncio
+    async def test_cancel_checks_reuse_redis_client(self, monkeypatch):
+        from sandcastle.engine import executor
+
+        monkeypatch.setattr(executor, "_redis_pool", None)
+        mock_redis = AsyncMock()
+        mock_redis.get.return_value = None
+
+        with (
+            patch("sandcastle.config.settings.redis_url", "redis://localhost:6379"),
+            patch("redis.asyncio.from_url", return_value=mock_redis) as mock_from_url,
+        ):
+            assert await _check_cancel("r1") is False
+            assert await _check_cancel("r1") is False
+
+        mock_from_url.assert_called_once()
+        assert mock_redis.get.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cancel_subscription_replaces_polling(self, monkeypatch):
+        from sandcastle.engine import executor
+
+        published = asyncio.Queue()
+        mock_redis = AsyncMock()
+        mock_redis.get.return_value = None
+        mock_redis.pubsub = MagicMock(return_value=FakePubSub(published))
+        monkeypatch.setattr(executor, "_redis_pool", mock_redis)
+
+        with patch("sandcastle.config.settings.redis_url", "redis://localhost:6379"):
+            async with executor._cancel_watch("r1"):
+                for _ in range(3):
+                    await asyncio.sleep(0)
+                    assert await _check_cancel("r1") is False
+                published.put_nowait(b"1")
+                for _ in range(5):
+                    await asyncio.sleep(0)
+                assert await _check_cancel("r1") is True
+            assert "r1" not in executor._cancel_events
+
+        # Only the subscription's initial flag read went to Redis
+        assert mock_redis.get.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_cancel_flag_reread_when_message_is_lost(self, monkeypatch):
+        from sandcastle.engine import executor
+
+        mock_redis = AsyncMock()
+        # The flag is set, but its pubsub message never arrives
+        mock_redis.get.side_effect = [None, b"1"]
+        mock_redis.pubsub = MagicMock(return_value=FakePubSub(asyncio.Queue()))
+        monkeypatch.setattr(executor, "_redis_pool", mock_redis)
+        monkeypatch.setattr(executor, "_CANCEL_POLL_INTERVAL", 0.01)
+
+        with patch("sandcastle.config.settings.redis_url", "redis://localhost:6379"):
+            async with executor._cancel_watch("r1"):
+                assert await _check_cancel("r1") is False
+                await asyncio.sleep(0.05)
+                assert await _check_cancel("r1") is True
+
+    @pytest.mark.asyncio
+    async def test_child_runs_share_parent_cancel_watch(self, monkeypatch):
+        from sandcastle.engine import executor
+
+        published = asyncio.Queue()
+        mock_redis = AsyncMock()
+        mock_redis.get.return_value = None
+        mock_redis.pubsub = MagicMock(return_value=FakePubSub(published))
+        monkeypatch.setattr(executor, "_redis_pool", mock_redis)
+
+        with patch("sandcastle.config.settings.redis_url", "redis://localhost:6379"):
+            async with executor._cancel_watch("parent"):
+                shared = executor._cancel_events["parent"]
+                async with executor._cancel_watch("child", shared):
+                    published.put_nowait(b"1")
+                    for _ in range(5):
+                        await asyncio.sleep(0)
+                    assert await _check_cancel("child") is True
+                assert "child" not in executor._cancel_events
+
+        mock_redis.pubsub.assert_called_once()
+
 
 # --- Replay context ---
 
@@ -499,3 +499,21 @@ def test_resolve_step_policies_inline():
     result = resolve_step_policies([inline], globals_)
     assert len(result) == 1
     assert result[0].id == "inline"
+
+
+def test_resolved_steps_built_with_plan():
+    """Global policies are merged into the steps once, when the plan is built."""
+    from sandcastle.engine.dag import build_plan
+
+    wf = parse_yaml_string(POLICY_WORKFLOW_YAML)
+    plan = build_plan(wf)
+
+    steps = plan.resolved_steps
+    assert [p.id for p in steps["scrape"].policies] == ["pii-guard", "secret-guard"]
+    assert [p.id for p in steps["analyze"].policies] == [
+        "pii-guard", "cost-alert", "secret-guard",
+    ]
+    assert steps["safe-step"].policies == []
+    assert all(isinstance(p, PEPolicyDefinition) for p in steps["analyze"].policies)
+    # The parsed workflow itself is left untouched
+    assert wf.get_step("analyze").policies is None